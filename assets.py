@@ -0,0 +1,114 @@
+import json
+import math
+import os
+import threading
+from functools import lru_cache
+
+import pygame
+
+# --- Fonts ---
+# pygame.font.SysFont scans every system font directory (fc-list on Linux)
+# the first time it is called, and again for each new name. Font names are
+# resolved with that scan once and their file paths kept in FONT_CACHE_FILE,
+# so later launches open the file directly. None is pygame's built-in font
+# and never needs a lookup.
+
+FONT_CACHE_FILE = 'font_cache.json'
+_font_paths = None # name -> file path, loaded from FONT_CACHE_FILE on first use
+
+def font_path(name, cache_file=FONT_CACHE_FILE): # File for a system font name, None for the built-in font
+    global _font_paths
+    if name is None: return None
+    if _font_paths is None:
+        try:
+            with open(cache_file) as f: _font_paths = json.load(f)
+        except (OSError, ValueError):
+            _font_paths = {}
+    if name in _font_paths:
+        path = _font_paths[name]
+        if path is None or os.path.exists(path): return path # None: not installed, pygame's font stands in
+    path = pygame.font.match_font(name) # The slow scan; None when no such font is installed
+    _font_paths[name] = path
+    try:
+        with open(cache_file, 'w') as f: json.dump(_font_paths, f)
+    except OSError as e:
+        print(f"Could not write font cache: {e}")
+    return path
+
+@lru_cache(maxsize=None)
+def load_font(name, size): # Same fonts as pygame.font.SysFont(name, size), without the rescan
+    return pygame.font.Font(font_path(name), size)
+# --- End Fonts ---
+
+
+# --- Background audio ---
+# Decoding the MP3s used to hold up the first frame. LazyAudio loads them on
+# a daemon thread; until they are in, the game simply runs silent. With
+# sound off nothing is loaded at all.
+#
+# Search steps can come far faster than pops can be heard, so pop() only
+# counts, and flush() (once per frame) plays at most one pop on a channel
+# reserved for it. Each new pop cuts off the last one. The more steps a frame
+# held, the louder its pop, so a faster search still sounds faster, but the
+# mixer work per frame stays the same at any step rate.
+
+POP_CHANNEL = 0       # Reserved, so music and other sounds never take it
+POP_RATE_BOOST = 0.1  # Extra volume per doubling of the pops in one frame
+
+class LazyAudio:
+    def __init__(self, music_file, pop_file, enabled=True, music_volume=0.5, pop_volume=0.7):
+        self.enabled = enabled
+        self.pop_sound = None
+        self.pop_volume = pop_volume
+        self.pending_pops = 0
+        self._pop_channel = None
+        self.music_loaded = False
+        self._loader = None
+        if enabled:
+            self._loader = threading.Thread(target=self._load, args=(music_file, pop_file, music_volume, pop_volume),
+                                            daemon=True)
+            self._loader.start()
+
+    def _load(self, music_file, pop_file, music_volume, pop_volume):
+        try:
+            if not pygame.mixer.get_init(): pygame.mixer.init()
+        except pygame.error as e:
+            print(f"Could not open audio: {e}")
+            return
+        try:
+            pygame.mixer.music.load(music_file)
+            pygame.mixer.music.set_volume(music_volume)
+            self.music_loaded = True
+        except (pygame.error, OSError) as e: # pygame 2 raises FileNotFoundError for a missing file
+            print(f"Could not load music file: {e}")
+        try:
+            sound = pygame.mixer.Sound(pop_file)
+            pygame.mixer.set_reserved(POP_CHANNEL + 1)
+            self._pop_channel = pygame.mixer.Channel(POP_CHANNEL)
+            self.pop_sound = sound
+        except (pygame.error, OSError) as e:
+            print(f"Could not load count sound file: {e}")
+
+    def wait_loaded(self, timeout=None): # True once the pop sound is ready, False if loading failed or timed out
+        if self._loader is not None: self._loader.join(timeout)
+        return self.pop_sound is not None
+
+    def pop(self): # Queues a pop for the next flush()
+        self.pending_pops += 1
+
+    def flush(self): # Called once per frame
+        pops, self.pending_pops = self.pending_pops, 0
+        if not pops or not self.pop_sound: return
+        self._pop_channel.set_volume(min(1.0, self.pop_volume + POP_RATE_BOOST * math.log2(pops)))
+        self._pop_channel.play(self.pop_sound)
+
+    def keep_music_playing(self): # Called every menu frame; starts the loop once the music is loaded
+        if not self.music_loaded or pygame.mixer.music.get_busy(): return
+        try: pygame.mixer.music.play(-1)
+        except pygame.error as e:
+            print(f"Music error: {e}")
+            self.music_loaded = False # Don't retry every frame
+
+    def stop_music(self):
+        if self.music_loaded: pygame.mixer.music.stop()
+# --- End Background audio ---
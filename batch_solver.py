@@ -0,0 +1,114 @@
+import sys
+import numpy as np
+
+from sudoku_core import solve_mrv
+from vector_bfs import candidate_masks
+from corpus import Corpus, CORPUS_SUFFIX
+
+# --- Vectorized batch solver ---
+# Runs constraint propagation (naked and hidden singles) over a whole
+# (N, 81) array of puzzles in lockstep. Only the puzzles that singles alone
+# cannot finish are handed to the per-puzzle bitmask DFS.
+
+_POPCOUNT = np.array([bin(m).count('1') for m in range(1024)], dtype=np.uint8)
+_LOWEST_DIGIT = np.array([(m & -m).bit_length() - 1 if m else 0 for m in range(1024)], dtype=np.uint8)
+_DIGIT_SHIFTS = np.arange(1, 10, dtype=np.uint16)
+_CELL_ROW = np.arange(81) // 9
+_CELL_COL = np.arange(81) % 9
+_CELL_BOX = (_CELL_ROW // 3) * 3 + _CELL_COL // 3
+_BOX_ORDER = np.argsort(_CELL_BOX, kind='stable') # Cell indices grouped box by box
+
+# Batch status codes
+UNSOLVED = 0
+SOLVED   = 1
+INVALID  = 2
+
+
+def strings_to_boards(lines): # ValueError unless every line is exactly 81 chars of 0-9 or '.'
+    texts = [line.strip() for line in lines]
+    for number, text in enumerate(texts, start=1):
+        if len(text) != 81: raise ValueError(f"Line {number} is {len(text)} chars, not an 81-char puzzle")
+    data = ''.join(texts).replace('.', '0').encode('ascii', errors='replace') # '?' for anything non-ASCII
+    boards = (np.frombuffer(data, dtype=np.uint8) - ord('0')).reshape(-1, 81)
+    bad = (boards > 9).any(axis=1) # Bytes below '0' wrap around past 9 too
+    if bad.any(): raise ValueError(f"Line {bad.argmax() + 1} has characters other than 0-9 and '.'")
+    return boards.copy()
+
+def boards_to_strings(boards):
+    return [bytes(row + ord('0')).decode('ascii') for row in boards.astype(np.uint8)]
+
+
+def _unit_counts(digit_bits): # digit_bits: (N, 81, 9) -> per-unit digit counts, each (N, 9, 9)
+    n = len(digit_bits)
+    rows = digit_bits.reshape(n, 9, 9, 9).sum(axis=2)
+    cols = digit_bits.reshape(n, 9, 9, 9).sum(axis=1)
+    boxes = digit_bits[:, _BOX_ORDER].reshape(n, 9, 9, 9).sum(axis=2)
+    return rows, cols, boxes
+
+def _conflict_rows(boards):
+    placed = (boards[:, :, None] == _DIGIT_SHIFTS).astype(np.uint8)
+    bad = np.zeros(len(boards), dtype=bool)
+    for counts in _unit_counts(placed):
+        bad |= (counts > 1).any(axis=(1, 2))
+    return bad
+
+def propagate_singles(boards): # In place; returns per-board status codes
+    status = np.full(len(boards), UNSOLVED, dtype=np.uint8)
+    status[_conflict_rows(boards)] = INVALID
+    active = np.flatnonzero(status == UNSOLVED)
+    while len(active):
+        sub = boards[active]
+        empty = sub == 0
+        cand = candidate_masks(sub)
+        dead = (empty & (cand == 0)).any(axis=1)
+
+        # Naked singles: exactly one candidate left in the cell
+        fill = np.where(empty & (_POPCOUNT[cand] == 1), _LOWEST_DIGIT[cand], 0)
+        # Hidden singles: a digit with exactly one possible cell in some unit
+        digit_bits = ((cand[:, :, None] >> _DIGIT_SHIFTS) & 1).astype(np.uint8)
+        rows, cols, boxes = _unit_counts(digit_bits)
+        only_place = (rows[:, _CELL_ROW] == 1) | (cols[:, _CELL_COL] == 1) | (boxes[:, _CELL_BOX] == 1)
+        hidden = (digit_bits == 1) & only_place
+        has_hidden = hidden.any(axis=2)
+        fill = np.where((fill == 0) & has_hidden, hidden.argmax(axis=2) + 1, fill).astype(np.uint8)
+
+        changed = (fill != 0).any(axis=1) & ~dead
+        sub[changed] += fill[changed]
+        boards[active] = sub
+
+        bad = dead | _conflict_rows(sub)
+        status[active[bad]] = INVALID
+        status[active[~bad & (sub != 0).all(axis=1)]] = SOLVED
+        active = active[~bad & changed & (sub == 0).any(axis=1)]
+    return status
+
+def solve_batch(boards): # Returns (solutions, status); unsolved rows fall back to solve_mrv
+    boards = np.array(boards, dtype=np.uint8).reshape(-1, 81)
+    status = propagate_singles(boards)
+    for idx in np.flatnonzero(status == UNSOLVED):
+        solution = solve_mrv(boards[idx].reshape(9, 9).tolist())
+        if solution is None:
+            status[idx] = INVALID
+        else:
+            boards[idx] = np.array(solution, dtype=np.uint8).reshape(81)
+            status[idx] = SOLVED
+    return boards, status
+# --- End Vectorized batch solver ---
+
+
+# python batch_solver.py puzzles.txt > solutions.txt
+# One 81-char puzzle per line in, one solution (or a blank line) per line out.
+# A .sudc corpus (see corpus.py) can stand in for the text file.
+def main():
+    if len(sys.argv) > 1 and sys.argv[1].endswith(CORPUS_SUFFIX):
+        with Corpus(sys.argv[1]) as corpus:
+            boards = corpus.boards()
+    else:
+        with open(sys.argv[1]) if len(sys.argv) > 1 else sys.stdin as source:
+            boards = strings_to_boards([line for line in source if line.strip()])
+    solutions, status = solve_batch(boards)
+    for text, code in zip(boards_to_strings(solutions), status):
+        print(text if code == SOLVED else '')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,440 @@
+import argparse
+import os
+import random
+import threading
+import time
+
+from sudoku_core import generate_puzzle, solve_bfs, backtrack_fill, grid_to_string, string_to_grid
+
+# Command line benchmarks for the headless solvers.
+# Usage: python bench.py <name> [options] > bench_output.txt
+
+
+def make_puzzles(count, holes, seed):
+    random.seed(seed)
+    return [generate_puzzle(holes=holes) for _ in range(count)]
+
+def time_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+# --- BFS: plain queue vs NumPy level-synchronous ---
+def bench_bfs(args):
+    from vector_bfs import solve_bfs_vectorized
+    puzzles = make_puzzles(args.count, args.holes, args.seed)
+    plain_total = vector_total = 0.0
+    for idx, puzzle in enumerate(puzzles):
+        plain, plain_t = time_call(solve_bfs, [row[:] for row in puzzle])
+        vector, vector_t = time_call(solve_bfs_vectorized, puzzle)
+        assert plain == vector, f"BFS mismatch on puzzle {idx}"
+        plain_total += plain_t
+        vector_total += vector_t
+        print(f"puzzle {idx:3d}: plain {plain_t*1000:9.2f} ms  numpy {vector_t*1000:8.2f} ms  x{plain_t/vector_t:6.1f}")
+    print(f"BFS holes={args.holes} puzzles={args.count}: plain {plain_total:.3f}s  numpy {vector_total:.3f}s  "
+          f"speedup x{plain_total/vector_total:.1f}")
+    # Cost of the live view's per-level counts and frontier samples
+    samples = []
+    sampled_total = sum(time_call(solve_bfs_vectorized, p, None, None, lambda d, paths: samples.append(paths))[1]
+                        for p in puzzles)
+    print(f"numpy with level samples: {sampled_total:.3f}s (x{sampled_total/vector_total:.2f}), "
+          f"{len(samples)} samples of <= {max(map(len, samples))} paths")
+# --- End BFS ---
+
+
+# --- Batch: NumPy lockstep propagation vs per-puzzle DFS loop ---
+def bench_batch(args):
+    from batch_solver import solve_batch, strings_to_boards, SOLVED
+    lines = [grid_to_string(p) for p in make_puzzles(args.count, args.holes, args.seed)]
+
+    start = time.perf_counter()
+    for line in lines: # What the DFS button does, minus the drawing
+        backtrack_fill(string_to_grid(line))
+    dfs_t = time.perf_counter() - start
+
+    start = time.perf_counter()
+    solutions, status = solve_batch(strings_to_boards(lines))
+    batch_t = time.perf_counter() - start
+    solved = int((status == SOLVED).sum())
+    print(f"batch holes={args.holes} puzzles={args.count}: DFS loop {args.count/dfs_t:10.1f} puzzles/s  "
+          f"batch {args.count/batch_t:10.1f} puzzles/s  ({solved} solved)  speedup x{dfs_t/batch_t:.1f}")
+# --- End Batch ---
+
+
+# --- Parallel: work-splitting DFS vs single-core bitmask DFS ---
+HARD_PUZZLES = [
+    '8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..',
+    '..............3.85..1.2.......5.7.....4...1...9.......5......73..2.1........4...9',
+    '.....6....59.....82....8....45........3........6..3.54...325..6..................',
+]
+
+def bench_parallel(args):
+    from sudoku_core import solve_mrv
+    from parallel_dfs import (solve_parallel, count_solutions_parallel, search_subproblem,
+                              split_subproblems, SPLIT_FACTOR)
+    workers = args.workers
+    for text in HARD_PUZZLES:
+        grid = string_to_grid(text)
+        serial, serial_t = time_call(solve_mrv, grid)
+        par, par_t = time_call(solve_parallel, grid, workers)
+        assert (serial is None) == (par is None)
+        print(f"solve {text[:20]}...: 1 core {serial_t:7.3f}s  {workers} workers {par_t:7.3f}s  x{serial_t/par_t:5.2f}")
+    for grid in make_puzzles(args.count, args.holes, args.seed)[:3]:
+        text = grid_to_string(grid)
+        serial, serial_t = time_call(search_subproblem, text, True, threading.Event(), lambda s: None)
+        par, par_t = time_call(count_solutions_parallel, grid, workers)
+        assert serial == par, f"count mismatch {serial} vs {par}"
+        print(f"count {par:8d} solutions: 1 core {serial_t:7.3f}s  {workers} workers {par_t:7.3f}s  x{serial_t/par_t:5.2f}")
+    # Few solutions and several workers: the split runs out of boards before
+    # reaching its target, so every solution is found while splitting
+    for seed in range(1000):
+        random.seed(seed)
+        text = grid_to_string(generate_puzzle(50))
+        if not split_subproblems(text, 2 * SPLIT_FACTOR)[0]: break
+    serial = search_subproblem(text, True, threading.Event(), lambda s: None)
+    for split_workers in (2, 3):
+        par = count_solutions_parallel(string_to_grid(text), split_workers)
+        assert serial == par, f"count mismatch {serial} vs {par} with {split_workers} workers"
+    print(f"count {serial:8d} solutions found while splitting: 2 and 3 workers agree")
+# --- End Parallel ---
+
+
+# --- Portfolio: each engine alone vs the race ---
+def bench_portfolio(args):
+    from portfolio import ENGINES, race
+    puzzles = [string_to_grid(t) for t in HARD_PUZZLES[:2]] + make_puzzles(args.count, args.holes, args.seed)
+    for grid in puzzles:
+        times = {}
+        for name, engine in ENGINES.items():
+            if name in ('dfs', 'bfs') and sum(n == 0 for row in grid for n in row) > 55:
+                continue # Naive engines take minutes on the hard set
+            _, times[name] = time_call(engine, grid)
+        _, winner, race_t = race(grid)
+        row = '  '.join(f"{name} {t*1000:8.1f}ms" for name, t in times.items())
+        print(f"{grid_to_string(grid)[:20]}...: {row}  | race {race_t*1000:8.1f}ms won by {winner}")
+# --- End Portfolio ---
+
+
+# --- Generation: symmetry transforms vs backtracking ---
+def _check_solved(grid):
+    size, box = len(grid), int(len(grid) ** 0.5)
+    starts = range(0, size, box)
+    units = [row for row in grid] + [list(col) for col in zip(*grid)] + \
+            [[grid[r][c] for r in range(br, br+box) for c in range(bc, bc+box)] for br in starts for bc in starts]
+    assert all(sorted(unit) == list(range(1, size + 1)) for unit in units), "invalid grid"
+
+def bench_gen(args):
+    from sudoku_core import generate_solved_grid
+    import tempfile
+    random.seed(args.seed)
+    generate_solved_grid() # Builds the seed cache outside the timing
+    for method in ('backtrack', 'transform'):
+        count = args.count * (1 if method == 'backtrack' else 1000)
+        grids, seconds = time_call(lambda: [generate_solved_grid(method) for _ in range(count)])
+        for grid in grids[:100]: _check_solved(grid)
+        print(f"gen {method:9s}: {count:8d} grids in {seconds:7.3f}s  {count/seconds:10.0f} grids/s  "
+              f"{seconds/count*1e6:9.1f} us/grid")
+    # Bulk corpus: puzzles written as 81-char lines
+    count = args.count * 1000
+    with tempfile.TemporaryFile('w') as f:
+        start = time.perf_counter()
+        for _ in range(count):
+            f.write(grid_to_string(generate_puzzle(holes=args.holes)) + '\n')
+        seconds = time.perf_counter() - start
+    print(f"corpus: {count} puzzles with {args.holes} holes written in {seconds:.3f}s  {count/seconds:.0f} puzzles/s")
+# --- End Generation ---
+
+
+# --- Rating: rated generation per difficulty band ---
+def bench_rate(args):
+    from rating import DIFFICULTY_ORDER, BASE_PUZZLES_PER_BAND, generate_rated_puzzle, rate_puzzle
+    random.seed(args.seed)
+    for band in DIFFICULTY_ORDER:
+        # Cold: the first requests have to dig every base puzzle
+        cold, cold_t = time_call(lambda: [generate_rated_puzzle(band) for _ in range(BASE_PUZZLES_PER_BAND)])
+        count = args.count * 20
+        warm, warm_t = time_call(lambda: [generate_rated_puzzle(band) for _ in range(count)])
+        _, rate_t = time_call(lambda: [rate_puzzle(grid) for grid, _ in warm])
+        hits = sum(rating['band'] == band for _, rating in cold + warm)
+        print(f"{band:7s}: dig {len(cold)/cold_t:7.1f} puzzles/s  pooled {count/warm_t:7.1f} puzzles/s  "
+              f"rate {rate_t/count*1000:6.2f} ms/puzzle  in band {hits}/{len(cold) + count}")
+# --- End Rating ---
+
+
+# --- Sizes: generation, search and drawing per board size ---
+def _render_frame(surface, font, grid, cell, glyphs=None): # The digit part of draw_grid_in_area
+    from sudoku_core import DIGIT_CHARS
+    for i, row in enumerate(grid):
+        for j, n in enumerate(row):
+            if n:
+                txt = glyphs[n] if glyphs else font.render(DIGIT_CHARS[n], True, (0, 0, 0))
+                surface.blit(txt, txt.get_rect(center=(j*cell + cell//2, i*cell + cell//2)))
+
+def bench_sizes(args):
+    from sudoku_core import (BOX_SIZES, DEFAULT_HOLES, DIGIT_CHARS, generate_solved_grid,
+                             solve_mrv, IterativeDFS)
+    from exact_cover import solve_exact_cover
+    try:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        import pygame
+        pygame.font.init()
+    except ImportError:
+        pygame = None
+    random.seed(args.seed)
+    for box in BOX_SIZES:
+        size = box * box
+        _, seed_t = time_call(generate_solved_grid, 'transform', box) # Builds this size's seeds
+        count = args.count * 100
+        grids, gen_t = time_call(lambda: [generate_solved_grid('transform', box) for _ in range(count)])
+        for grid in grids[:20]: _check_solved(grid)
+        puzzles = [generate_puzzle(DEFAULT_HOLES[box], box=box) for _ in range(args.count)]
+        solutions, mrv_t = time_call(lambda: [solve_mrv(p) for p in puzzles])
+        for grid in solutions: _check_solved(grid)
+        _, cover_t = time_call(lambda: [solve_exact_cover(p) for p in puzzles])
+        solver = IterativeDFS(puzzles[0])
+        _, dfs_t = time_call(solver.run, 200000)
+        print(f"{size:2d}x{size:<2d} holes {DEFAULT_HOLES[box]:3d}: seeds {seed_t*1000:8.1f} ms  "
+              f"gen {count/gen_t:8.0f} grids/s  mrv {mrv_t/args.count*1000:8.2f} ms  "
+              f"exact cover {cover_t/args.count*1000:8.2f} ms  DFS {solver.steps/dfs_t:8.0f} steps/s ({solver.status})")
+        if pygame:
+            cell = 540 // size
+            font = pygame.font.SysFont(None, int(cell * 0.75))
+            glyphs = [None] + [font.render(DIGIT_CHARS[n], True, (0, 0, 0)) for n in range(1, size + 1)]
+            surface = pygame.Surface((540, 540))
+            frames = 50
+            _, plain_t = time_call(lambda: [_render_frame(surface, font, grids[0], cell) for _ in range(frames)])
+            _, cached_t = time_call(lambda: [_render_frame(surface, font, grids[0], cell, glyphs) for _ in range(frames)])
+            print(f"{'':16s}draw digits: render per cell {plain_t/frames*1000:6.2f} ms/frame  "
+                  f"cached glyphs {cached_t/frames*1000:6.2f} ms/frame")
+# --- End Sizes ---
+
+
+# --- Hints: incremental candidate grid vs recomputing with is_valid ---
+def _scratch_single(grid): # Naked or hidden single from candidates rebuilt with is_valid
+    from sudoku_core import is_valid
+    size, box = len(grid), int(len(grid) ** 0.5)
+    cand = {(r, c): [n for n in range(1, size + 1) if is_valid(grid, r, c, n)]
+            for r in range(size) for c in range(size) if grid[r][c] == 0}
+    for (r, c), digits in cand.items():
+        if len(digits) == 1: return r, c, digits[0]
+    units = [[(r, c) for c in range(size)] for r in range(size)] + [[(r, c) for r in range(size)] for c in range(size)] + \
+            [[(r, c) for r in range(br, br+box) for c in range(bc, bc+box)] for br in range(0, size, box) for bc in range(0, size, box)]
+    for unit in units:
+        for n in range(1, size + 1):
+            spots = [cell for cell in unit if n in cand.get(cell, ())]
+            if len(spots) == 1: return spots[0] + (n,)
+    return None
+
+def bench_hints(args):
+    from sudoku_core import BOX_SIZES, DEFAULT_HOLES
+    from hints import CandidateGrid
+    random.seed(args.seed)
+    for box in BOX_SIZES[1:]:
+        puzzles = [generate_puzzle(DEFAULT_HOLES[box], box=box) for _ in range(args.count)]
+        scratch_hints = incremental_hints = 0
+        start = time.perf_counter()
+        for puzzle in puzzles:
+            grid = [row[:] for row in puzzle]
+            while True:
+                found = _scratch_single(grid)
+                if found is None: break
+                grid[found[0]][found[1]] = found[2]
+                scratch_hints += 1
+        scratch_t = time.perf_counter() - start
+        start = time.perf_counter()
+        for puzzle in puzzles:
+            hinter = CandidateGrid(puzzle)
+            while True:
+                hint = hinter.next_hint()
+                if hint is None: break
+                hinter.apply_hint(hint)
+                incremental_hints += 1
+        incremental_t = time.perf_counter() - start
+        size = box * box
+        print(f"{size:2d}x{size:<2d}: is_valid rebuild {scratch_t/scratch_hints*1000:8.3f} ms/hint ({scratch_hints} singles)  "
+              f"candidate grid {incremental_t/incremental_hints*1000:8.3f} ms/hint ({incremental_hints} hints)  "
+              f"x{(scratch_t/scratch_hints)/(incremental_t/incremental_hints):6.1f}")
+# --- End Hints ---
+
+
+# --- Export: streaming the DFS tree to disk ---
+def bench_export(args):
+    import tempfile
+    from sudoku_core import IterativeDFS
+    from tree_export import TreeExporter, export_dfs_tree
+    nodes = 1_000_000
+    grid = string_to_grid(HARD_PUZZLES[1]) # First-empty DFS runs for millions of steps on this one
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ('tree.jsonl', 'tree.jsonl.gz', 'tree.dot', 'tree.dot.gz'):
+            path = os.path.join(tmp, name)
+            start = time.perf_counter() # Writer alone: a synthetic chain of tries and backtracks
+            with TreeExporter(path) as out:
+                for node_id in range(2, nodes + 2):
+                    out.add_node(node_id, node_id // 2, '(4,4)=5', 20)
+                    if node_id % 2: out.set_status(node_id, 'backtracked')
+            write_t = time.perf_counter() - start
+            size = os.path.getsize(path)
+            (_, written), dfs_t = time_call(export_dfs_tree, grid, path, nodes)
+            print(f"{name:14s}: writer {nodes/write_t:9.0f} nodes/s ({write_t:5.2f}s per 1M, {size/2**20:6.1f} MB)  "
+                  f"DFS + export {written/dfs_t:9.0f} nodes/s ({written} nodes in {dfs_t:5.2f}s)")
+    solver = IterativeDFS(grid)
+    _, bare_t = time_call(solver.run, nodes)
+    print(f"DFS without export: {solver.steps/bare_t:9.0f} steps/s")
+# --- End Export ---
+
+
+# --- Service: easy-puzzle requests per second over localhost HTTP ---
+def _service_client(port, puzzles, rounds, per_request, out):
+    import http.client, json
+    conn = http.client.HTTPConnection('127.0.0.1', port) # One keep-alive connection per client
+    ok = 0
+    for _ in range(rounds):
+        for i in range(0, len(puzzles), per_request):
+            chunk = puzzles[i:i + per_request]
+            body = {'puzzle': chunk[0]} if per_request == 1 else {'puzzles': chunk}
+            conn.request('POST', '/solve', json.dumps(body), {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            answer = json.loads(response.read())
+            if response.status == 200:
+                ok += sum(s is not None for s in answer.get('solutions', [answer.get('solution')]))
+    out.put(ok)
+
+def bench_service(args):
+    import multiprocessing as mp
+    from solve_service import WorkerPool, make_server
+    puzzles = [grid_to_string(p) for p in make_puzzles(args.count, args.holes, args.seed)]
+    pool = WorkerPool(args.workers)
+    server = make_server(pool, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    rounds, clients = 20, 8
+    for per_request in (1, 10):
+        out = mp.Queue()
+        procs = [mp.Process(target=_service_client, args=(server.server_address[1], puzzles, rounds, per_request, out))
+                 for _ in range(clients)]
+        start = time.perf_counter()
+        for p in procs: p.start()
+        ok = sum(out.get() for _ in procs)
+        elapsed = time.perf_counter() - start
+        for p in procs: p.join()
+        total = clients * rounds * len(puzzles)
+        print(f"service, {per_request:2d} per request: {ok}/{total} solved in {elapsed:.2f}s, {total/elapsed:.0f} puzzles/s "
+              f"({clients} keep-alive clients, {args.workers} workers, holes={args.holes})")
+    server.shutdown()
+    pool.close()
+# --- End Service ---
+
+
+# --- Startup: launch to first menu frame ---
+def bench_startup(args):
+    import statistics, subprocess, sys
+    env = dict(os.environ)
+    env.setdefault('SDL_VIDEODRIVER', 'dummy') # Headless is fine, the first frame is still drawn
+    env.setdefault('SDL_AUDIODRIVER', 'dummy')
+    for flags in ([], ['--no-sound']):
+        first_frame, wall = [], []
+        for _ in range(args.count):
+            start = time.perf_counter()
+            out = subprocess.run([sys.executable, 'main.py', '--startup-time'] + flags, env=env,
+                                 capture_output=True, text=True).stdout
+            wall.append(1000 * (time.perf_counter() - start))
+            first_frame += [float(line.split()[1]) for line in out.splitlines() if line.startswith('Startup:')]
+        print(f"startup {' '.join(flags) or '(sound on)':12s}: first frame {statistics.median(first_frame):6.1f} ms "
+              f"after imports began, whole process {statistics.median(wall):6.1f} ms (median of {args.count})")
+# --- End Startup ---
+
+
+# --- Audio: pop cost per frame at rising step rates ---
+AUDIO_LOAD_WAIT = 10 # Seconds to wait for LazyAudio's loader thread
+
+def bench_audio(args):
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import pygame
+    from assets import LazyAudio
+    pygame.mixer.init()
+    audio = LazyAudio('kids-game-gaming-background-music-295075.mp3', 'bubble-pop-2-293341.mp3')
+    if not audio.wait_loaded(AUDIO_LOAD_WAIT): # Loaded on the background thread
+        print("audio: pop sound did not load, skipping")
+        pygame.mixer.quit()
+        return
+    sound = pygame.mixer.Sound('bubble-pop-2-293341.mp3')
+    frames = 200
+    for steps in (1, 10, 100, 1000):
+        start = time.perf_counter()
+        for _ in range(frames):
+            for _ in range(steps): sound.play() # One mixer channel grab per step
+        direct_t = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(frames):
+            for _ in range(steps): audio.pop()
+            audio.flush()
+        pooled_t = time.perf_counter() - start
+        print(f"{steps:5d} steps/frame: Sound.play {1000*direct_t/frames:8.3f} ms/frame  "
+              f"coalesced {1000*pooled_t/frames:7.3f} ms/frame")
+    pygame.mixer.quit()
+# --- End Audio ---
+
+
+# --- Corpus: binary mmap store against re-parsing text ---
+def bench_corpus(args):
+    import tempfile
+    from corpus import Corpus, convert_text, canonical_hashes
+    from batch_solver import strings_to_boards
+    random.seed(args.seed)
+    count = args.count * 1000
+    lines = [grid_to_string(generate_puzzle(holes=args.holes)) + '\n' for _ in range(count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path, corpus_path = os.path.join(tmp, 'puzzles.txt'), os.path.join(tmp, 'puzzles.sudc')
+        with open(text_path, 'w') as f: f.writelines(lines)
+        _, hash_t = time_call(lambda: canonical_hashes(strings_to_boards(lines)))
+        with open(text_path) as f: _, convert_t = time_call(lambda: convert_text(f, corpus_path))
+        print(f"convert: {count} puzzles in {convert_t:.3f}s  {count/convert_t:.0f} puzzles/s  "
+              f"(canonical hash {hash_t/count*1e6:.1f} us/puzzle)  "
+              f"{os.path.getsize(text_path)/2**20:.1f} MB text -> {os.path.getsize(corpus_path)/2**20:.1f} MB")
+        picks = [random.randrange(count) for _ in range(1000)]
+        def text_reads(): # What a caller without an index does: parse the file, then pick
+            with open(text_path) as f: puzzles = [line.strip() for line in f]
+            return [puzzles[n] for n in picks]
+        texts, text_t = time_call(text_reads)
+        def corpus_reads():
+            with Corpus(corpus_path) as corpus: return [corpus.puzzle(n) for n in picks]
+        stored, corpus_t = time_call(corpus_reads)
+        assert stored == texts
+        print(f"1000 random reads: text {1000*text_t:8.2f} ms  corpus {1000*corpus_t:8.2f} ms  "
+              f"({corpus_t/1000*1e6:.2f} us/read incl. open)")
+        with open(text_path) as f: _, text_bulk_t = time_call(lambda: strings_to_boards(f.readlines()))
+        with Corpus(corpus_path) as corpus:
+            boards, bulk_t = time_call(corpus.boards)
+            del boards # Drop the view before close
+        print(f"all boards: text {1000*text_bulk_t:8.2f} ms  corpus {1000*bulk_t:8.2f} ms")
+# --- End Corpus ---
+
+
+BENCHMARKS = {
+    'bfs': bench_bfs,
+    'batch': bench_batch,
+    'parallel': bench_parallel,
+    'portfolio': bench_portfolio,
+    'gen': bench_gen,
+    'rate': bench_rate,
+    'sizes': bench_sizes,
+    'hints': bench_hints,
+    'export': bench_export,
+    'service': bench_service,
+    'startup': bench_startup,
+    'audio': bench_audio,
+    'corpus': bench_corpus,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Sudoku solver benchmarks")
+    parser.add_argument('name', choices=sorted(BENCHMARKS))
+    parser.add_argument('--count', type=int, default=10, help="number of puzzles")
+    parser.add_argument('--holes', type=int, default=50, help="empty cells per generated puzzle")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="processes for parallel engines")
+    args = parser.parse_args()
+    BENCHMARKS[args.name](args)
+
+if __name__ == '__main__':
+    main()
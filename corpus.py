@@ -0,0 +1,308 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+from array import array
+from itertools import permutations
+
+from rating import DIFFICULTY_ORDER
+
+try:
+    import numpy as np
+except ImportError: # Reading still works record by record; converting needs NumPy
+    np = None
+
+# --- Binary puzzle corpus ---
+# A corpus file holds 9x9 puzzles as fixed-width records, so record #N sits
+# at records_offset + N * record_size and is read straight out of an mmap:
+# no parsing, no index to load, and sampling from 50 million puzzles costs
+# the same as from 50. Each record is
+#
+#   hash    u64   canonical hash (see canonical_hashes)
+#   score   u16   rating score, UNRATED if the puzzle was not rated
+#   clues   u8
+#   band    u8    index into DIFFICULTY_ORDER, UNRATED_BAND if not rated
+#   puzzle  41 B  two digits per byte, high nibble first, so bytes.hex() reads it back
+#   solution 41 B same packing, present when the file has FLAG_SOLUTIONS
+#   (padding to a multiple of 8)
+#
+# The 64-byte header gives the layout, and is followed by the band index:
+# one (offset, count) per band (DIFFICULTY_ORDER, then unrated) into an
+# array of u32 record ids grouped by band, written after the records.
+# Sampling a band is then one random pick from that band's id slice.
+
+MAGIC = b'SUDCORP1'
+VERSION = 1
+FLAG_SOLUTIONS = 1
+CELLS = 81
+PACKED = (CELLS + 1) // 2
+UNRATED = 0xFFFF
+UNRATED_BAND = 0xFF
+BANDS = DIFFICULTY_ORDER + ['Unrated'] # Band index order
+CORPUS_SUFFIX = '.sudc'
+
+_HEADER = struct.Struct('<8sHHHHQQQ24x') # magic, version, flags, cells, record size, count, records offset, ids offset
+_BAND_ENTRY = struct.Struct('<QQ') # First id slot and number of ids for one band
+_META = struct.Struct('<QHBB') # hash, score, clues, band
+HEADER_SIZE = _HEADER.size + _BAND_ENTRY.size * len(BANDS)
+CHUNK = 4096 # Puzzles converted per NumPy batch
+
+
+def record_size(with_solutions):
+    size = _META.size + PACKED * (2 if with_solutions else 1)
+    return (size + 7) // 8 * 8
+
+def pack_digits(text): # 81-char digit string -> 41 bytes
+    return bytes.fromhex(text + '0' * (len(text) % 2))
+
+def unpack_digits(packed): # 41 bytes -> 81-char digit string
+    return packed.hex()[:CELLS]
+
+
+# --- Canonical hash ---
+# Puzzles that differ only by relabelling digits, transposing, or reordering
+# bands and stacks get the same hash. Of those 72 grid variants, the ones
+# whose clue positions come earliest (emptier first, read as a bit string)
+# are kept. Those candidates are relabelled so digits appear in order 1, 2,
+# 3... in reading order, and the smallest is hashed. Both steps depend only
+# on the variant, so every member of a class picks the same form. Most
+# puzzles have a single candidate after the first step, which keeps the
+# relabelling off the 72-wide arrays. Row swaps inside a band are not folded
+# in (that would mean 46656 times as many variants), so some equivalent
+# puzzles still hash apart; the hash is for spotting duplicates cheaply, not
+# for proving two puzzles different.
+def _variant_cells(): # (72, 81) source cell for every cell of every variant
+    rows = []
+    for transpose in (False, True):
+        for bands in permutations(range(3)):
+            for stacks in permutations(range(3)):
+                cells = []
+                for r in range(9):
+                    for c in range(9):
+                        sr, sc = bands[r // 3]*3 + r % 3, stacks[c // 3]*3 + c % 3
+                        cells.append(sc*9 + sr if transpose else sr*9 + sc)
+                rows.append(cells)
+    return rows
+
+def _line_tables(): # (6, 512) a 9-cell line's clue mask (bit 8 = first cell) with its thirds reordered
+    tables = []
+    for thirds in permutations(range(3)):
+        source = [thirds[c // 3]*3 + c % 3 for c in range(9)]
+        tables.append([sum(((mask >> (8 - source[c])) & 1) << (8 - c) for c in range(9)) for mask in range(512)])
+    return tables
+
+_VARIANTS = _variant_cells()
+_LINE_TABLES = _line_tables()
+_BAND_ORDERS = [[bands[r // 3]*3 + r % 3 for r in range(9)] for bands in permutations(range(3))]
+_CHUNK_BOUNDS = [(0, 19), (19, 38), (38, 57), (57, 76), (76, 81)] # 19 decimal digits fit a u64
+
+def _keep_smallest(alive, keys): # Narrows alive (n, variants) to the variants with the smallest key
+    masked = np.where(alive, keys, np.iinfo(keys.dtype).max)
+    return alive & (masked == masked.min(axis=1, keepdims=True))
+
+def canonical_hashes(boards): # (n, 81) uint8 -> (n,) uint64
+    # Clue pattern of every variant, built from 9-bit line masks rather than 72 copies of the board
+    filled = (boards != 0).reshape(-1, 9, 9).astype(np.uint16)
+    bits = np.uint16(1) << np.arange(8, -1, -1, dtype=np.uint16)
+    lines = np.stack([(filled * bits).sum(axis=2), (filled * bits[:, None]).sum(axis=1)], axis=1) # (n, 2, 9) rows, columns
+    codes = np.array(_LINE_TABLES, dtype=np.uint64)[:, lines] # (6 stack orders, n, 2, 9)
+    codes = codes.transpose(1, 2, 0, 3)[..., np.array(_BAND_ORDERS)] # (n, transpose, stacks, bands, 9)
+    codes = codes.transpose(0, 1, 3, 2, 4).reshape(len(boards), 72, 9) # Same order as _VARIANTS
+    weights = np.uint64(1) << (np.uint64(9) * np.arange(6, -1, -1, dtype=np.uint64))
+    alive = np.ones((len(boards), 72), dtype=bool)
+    alive = _keep_smallest(alive, (codes[..., :7] * weights).sum(axis=2, dtype=np.uint64))
+    alive = _keep_smallest(alive, (codes[..., 7] << np.uint64(9)) | codes[..., 8])
+    owner, variant = np.nonzero(alive) # Candidates, grouped by puzzle
+    rows = boards[owner[:, None], np.array(_VARIANTS)[variant]] # (candidates, 81)
+    first_seen = np.empty((len(rows), 10), dtype=np.int16)
+    first_seen[:, 0] = -1 # Empty stays 0
+    for d in range(1, 10):
+        hit = rows == d
+        first_seen[:, d] = np.where(hit.any(axis=1), hit.argmax(axis=1), CELLS)
+    labels = first_seen.argsort(axis=1, kind='stable').argsort(axis=1, kind='stable').astype(np.uint8)
+    relabelled = np.take_along_axis(labels, rows.astype(np.intp), axis=1)
+    chunks = np.stack([(relabelled[:, lo:hi].astype(np.uint64) * 10 ** np.arange(hi - lo - 1, -1, -1, dtype=np.uint64))
+                       .sum(axis=1, dtype=np.uint64) for lo, hi in _CHUNK_BOUNDS], axis=1)
+    order = np.lexsort([chunks[:, k] for k in range(len(_CHUNK_BOUNDS) - 1, -1, -1)] + [owner])
+    _, first = np.unique(owner[order], return_index=True) # Smallest candidate of each puzzle
+    best = chunks[order[first]]
+    hashes = np.full(len(boards), 0xCBF29CE484222325, dtype=np.uint64) # FNV-1a over the five chunks
+    for k in range(len(_CHUNK_BOUNDS)):
+        hashes ^= best[:, k]
+        hashes *= np.uint64(0x100000001B3)
+    return hashes
+# --- End Canonical hash ---
+
+
+# --- Reading ---
+class Corpus:
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        if os.fstat(self._file.fileno()).st_size < HEADER_SIZE:
+            self._file.close()
+            raise ValueError(f"{path} is too short to be a corpus file")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, cells, self.record_size, self.count, self._records, ids = \
+            _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or cells != CELLS:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} 9x9 corpus file")
+        self.has_solutions = bool(flags & FLAG_SOLUTIONS)
+        self._bands = {}
+        for i, band in enumerate(BANDS):
+            first, count = _BAND_ENTRY.unpack_from(self._map, _HEADER.size + i * _BAND_ENTRY.size)
+            self._bands[band] = (ids + 4 * first, count)
+
+    def __len__(self):
+        return self.count
+
+    def raw(self, n): # Record n as a zero-copy memoryview into the map
+        if not 0 <= n < self.count: raise IndexError(f"Record {n} out of range 0..{self.count - 1}")
+        start = self._records + n * self.record_size
+        return memoryview(self._map)[start:start + self.record_size]
+
+    def puzzle(self, n): # 81-char string
+        if not 0 <= n < self.count: raise IndexError(f"Record {n} out of range 0..{self.count - 1}")
+        start = self._records + n * self.record_size + _META.size
+        return unpack_digits(self._map[start:start + PACKED])
+
+    def record(self, n): # {'puzzle', 'solution', 'clues', 'score', 'band', 'hash'}
+        rec = self.raw(n)
+        hash_, score, clues, band = _META.unpack_from(rec, 0)
+        solution = None
+        if self.has_solutions: solution = unpack_digits(rec[_META.size + PACKED:_META.size + 2*PACKED])
+        return {'puzzle': unpack_digits(rec[_META.size:_META.size + PACKED]), 'solution': solution,
+                'clues': clues, 'score': None if score == UNRATED else score,
+                'band': None if band == UNRATED_BAND else DIFFICULTY_ORDER[band], 'hash': hash_}
+
+    def band_size(self, band):
+        return self._bands[band][1]
+
+    def sample_index(self, band=None, rng=random): # O(1) random record number, from one band if given
+        if band is None: return rng.randrange(self.count)
+        offset, count = self._bands[band]
+        if not count: raise ValueError(f"No {band} puzzles in this corpus")
+        return struct.unpack_from('<I', self._map, offset + 4 * rng.randrange(count))[0]
+
+    def sample(self, band=None, rng=random): # Random puzzle as a grid (list of rows)
+        text = self.puzzle(self.sample_index(band, rng))
+        return [[int(ch) for ch in text[r*9:(r+1)*9]] for r in range(9)]
+
+    def records(self): # NumPy structured view over every record, zero-copy
+        names = ['hash', 'score', 'clues', 'band', 'puzzle', 'solution'][:6 if self.has_solutions else 5]
+        formats = ['<u8', '<u2', 'u1', 'u1', ('u1', PACKED), ('u1', PACKED)][:len(names)]
+        offsets = [0, 8, 10, 11, _META.size, _META.size + PACKED][:len(names)]
+        dtype = np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': self.record_size})
+        return np.frombuffer(self._map, dtype=dtype, count=self.count, offset=self._records)
+
+    def boards(self, start=0, stop=None, field='puzzle'): # (n, 81) uint8 boards, ready for solve_batch
+        packed = self.records()[field][start:stop]
+        boards = np.empty((len(packed), 2 * PACKED), dtype=np.uint8)
+        boards[:, 0::2] = packed >> 4
+        boards[:, 1::2] = packed & 0x0F
+        return boards[:, :CELLS]
+
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError: # Views from records() or raw() still point into the map; it goes with the last one
+            pass
+        self._file.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+# --- End Reading ---
+
+
+# --- Writing ---
+def _rate_chunk(lines): # (score, band index) per puzzle, run in a worker process
+    from rating import rate_puzzle
+    out = []
+    for text in lines:
+        rating = rate_puzzle([[int(ch) for ch in text[r*9:(r+1)*9]] for r in range(9)])
+        out.append((rating['score'], DIFFICULTY_ORDER.index(rating['band'])) if rating['solutions'] == 1
+                   else (UNRATED, UNRATED_BAND)) # Broken or ambiguous puzzles get no rating
+    return out
+
+def _read_chunks(source):
+    chunk = []
+    for line in source:
+        text = line.strip().replace('.', '0')
+        if not text: continue
+        if len(text) != CELLS or not text.isdigit(): raise ValueError(f"Not an 81-char puzzle: {line.strip()!r}")
+        chunk.append(text)
+        if len(chunk) == CHUNK:
+            yield chunk
+            chunk = []
+    if chunk: yield chunk
+
+def convert_text(source, path, solve=False, rate=False, workers=None):
+    # Writes the 81-char puzzles from the source lines to a corpus file; returns the record count
+    from batch_solver import solve_batch, boards_to_strings, strings_to_boards, SOLVED
+    size = record_size(solve)
+    empty_record = b'\0' * size
+    band_ids = [array('I') for _ in BANDS]
+    pool = None
+    if rate:
+        import multiprocessing as mp
+        pool = mp.Pool(workers)
+    count = 0
+    with open(path, 'wb') as out:
+        out.write(b'\0' * HEADER_SIZE) # Filled in once the count and band sizes are known
+        records_offset = HEADER_SIZE
+        for chunk in _read_chunks(source):
+            boards = strings_to_boards(chunk)
+            clues = (boards != 0).sum(axis=1)
+            hashes = canonical_hashes(boards)
+            solutions = [None] * len(chunk)
+            if solve:
+                solved, status = solve_batch(boards)
+                solutions = [s if code == SOLVED else None for s, code in zip(boards_to_strings(solved), status)]
+            ratings = [(UNRATED, UNRATED_BAND)] * len(chunk)
+            if pool:
+                step = max(1, len(chunk) // (4 * (workers or os.cpu_count() or 1)))
+                ratings = [r for part in pool.map(_rate_chunk, [chunk[i:i + step] for i in range(0, len(chunk), step)])
+                           for r in part]
+            block = bytearray(empty_record * len(chunk))
+            for i, text in enumerate(chunk):
+                at = i * size
+                score, band = ratings[i]
+                _META.pack_into(block, at, int(hashes[i]), score, int(clues[i]), band)
+                block[at + _META.size:at + _META.size + PACKED] = pack_digits(text)
+                if solutions[i]: block[at + _META.size + PACKED:at + _META.size + 2*PACKED] = pack_digits(solutions[i])
+                band_ids[len(DIFFICULTY_ORDER) if band == UNRATED_BAND else band].append(count + i)
+            out.write(block)
+            count += len(chunk)
+        ids_offset = records_offset + count * size
+        header = bytearray(_HEADER.pack(MAGIC, VERSION, FLAG_SOLUTIONS if solve else 0, CELLS, size,
+                                        count, records_offset, ids_offset))
+        first = 0
+        for ids in band_ids:
+            header += _BAND_ENTRY.pack(first, len(ids))
+            first += len(ids)
+            out.write(ids.tobytes())
+        out.seek(0)
+        out.write(header)
+    if pool: pool.close()
+    return count
+# --- End Writing ---
+# --- End Binary puzzle corpus ---
+
+
+# python corpus.py puzzles.txt puzzles.sudc [--solve] [--rate]
+def main():
+    parser = argparse.ArgumentParser(description="Convert 81-char puzzle lines to a binary corpus file")
+    parser.add_argument('source', help="text file with one puzzle per line, '-' for stdin")
+    parser.add_argument('target', help=f"corpus file to write, e.g. puzzles{CORPUS_SUFFIX}")
+    parser.add_argument('--solve', action='store_true', help="store a solution with every puzzle")
+    parser.add_argument('--rate', action='store_true', help="rate every puzzle (slow, uses all cores)")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    with open(args.source) if args.source != '-' else sys.stdin as source:
+        count = convert_text(source, args.target, args.solve, args.rate, args.workers)
+    print(f"{count} puzzles written to {args.target}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+from functools import lru_cache
+from itertools import product
+
+from sudoku_core import box_size
+
+# --- Exact cover solver (Knuth's Algorithm X, dict-of-sets form) ---
+# Sudoku as exact cover: every candidate (r, c, n) covers four constraints,
+# "cell r,c filled", "row r has n", "col c has n" and "box b has n". A
+# solution picks 81 candidates that cover all 324 constraints exactly once
+# (N*N candidates and 4*N*N constraints on an N x N board).
+
+def _constraints(r, c, n, box=3):
+    b = (r//box)*box + c//box
+    return (('cell', r, c), ('row', r, n), ('col', c, n), ('box', b, n))
+
+@lru_cache(maxsize=None)
+def _rows_for(box): # Candidate -> constraints it covers, built once per box size
+    size = box * box
+    return {(r, c, n): _constraints(r, c, n, box)
+            for r, c, n in product(range(size), range(size), range(1, size + 1))}
+
+
+def _select(columns, rows, row):
+    removed = []
+    for col in rows[row]:
+        for other in columns[col]:
+            for other_col in rows[other]:
+                if other_col != col:
+                    columns[other_col].remove(other)
+        removed.append(columns.pop(col))
+    return removed
+
+def _deselect(columns, rows, row, removed):
+    for col in reversed(rows[row]):
+        columns[col] = removed.pop()
+        for other in columns[col]:
+            for other_col in rows[other]:
+                if other_col != col:
+                    columns[other_col].add(other)
+
+def _search(columns, rows, partial):
+    if not columns: return True
+    col = min(columns, key=lambda key: len(columns[key])) # Fewest options first
+    for row in list(columns[col]):
+        partial.append(row)
+        removed = _select(columns, rows, row)
+        if _search(columns, rows, partial): return True
+        _deselect(columns, rows, row, removed)
+        partial.pop()
+    return False
+
+def solve_exact_cover(grid): # Returns a solved copy of grid or None
+    rows = _rows_for(box_size(grid))
+    columns = {}
+    for row, cols in rows.items():
+        for col in cols:
+            columns.setdefault(col, set()).add(row)
+    partial = []
+    for r in range(len(grid)):
+        for c in range(len(grid)):
+            n = grid[r][c]
+            if n:
+                if any(col not in columns for col in rows[(r, c, n)]): return None # Clashing givens
+                _select(columns, rows, (r, c, n))
+    if not _search(columns, rows, partial): return None
+    result = [row[:] for row in grid]
+    for r, c, n in partial:
+        result[r][c] = n
+    return result
+# --- End Exact cover solver ---
@@ -0,0 +1,242 @@
+from functools import lru_cache
+from itertools import combinations
+import math
+
+from sudoku_core import all_digits_mask, DIGIT_CHARS
+
+# --- Logical hint engine ---
+# CandidateGrid keeps the pencil marks of a board up to date as cells are
+# placed and candidates are struck out, instead of recomputing them from the
+# rows, columns and boxes for every hint. Alongside the masks it tracks how
+# many cells of each unit can still take each digit, so naked and hidden
+# singles are found from two small "ready" sets. Every change goes on an undo
+# log, and undo() rolls back to the last mark() in time proportional to the
+# work being undone.
+# Cells are flat indices r*N + c; candidates use bit n for digit n, as in sudoku_core.
+
+# Eliminations are tried cheapest first whenever no single is left
+ELIMINATIONS = ['pointing_pair', 'box_line_reduction', 'naked_pair', 'naked_triple', 'naked_quad']
+TECHNIQUE_NAMES = {
+    'naked_single': "Naked single",
+    'hidden_single': "Hidden single",
+    'pointing_pair': "Pointing pair",
+    'box_line_reduction': "Box/line reduction",
+    'naked_pair': "Naked pair",
+    'naked_triple': "Naked triple",
+    'naked_quad': "Naked quad",
+}
+_SUBSET_SIZES = {'naked_pair': 2, 'naked_triple': 3, 'naked_quad': 4}
+
+
+@lru_cache(maxsize=None)
+def _layout(box): # Units and lookups for one board size, built on first use
+    size = box * box
+    rows = [[r*size + c for c in range(size)] for r in range(size)]
+    cols = [[r*size + c for r in range(size)] for c in range(size)]
+    boxes = [[r*size + c for r in range(br, br+box) for c in range(bc, bc+box)]
+             for br in range(0, size, box) for bc in range(0, size, box)]
+    units = rows + cols + boxes # Unit ids: rows 0..N-1, cols N..2N-1, boxes 2N..3N-1
+    units_of = [(i // size, size + i % size, 2*size + (i // size // box)*box + (i % size) // box)
+                for i in range(size * size)]
+    peers = [tuple(sorted(set(units[a] + units[b] + units[c]) - {i})) for i, (a, b, c) in enumerate(units_of)]
+    return units, units_of, peers
+
+
+def _digits(mask):
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        yield bit.bit_length() - 1
+
+
+class CandidateGrid:
+    def __init__(self, grid):
+        self.size = len(grid)
+        self.box = math.isqrt(self.size)
+        self.units, self.units_of, self.peers = _layout(self.box)
+        self.cells = [n for row in grid for n in row]
+        self.cand = [0] * len(self.cells)
+        self.placed = [0] * len(self.units) # Digits already placed per unit
+        self.where = [[0] * (self.size + 1) for _ in self.units] # Cells per unit that can take each digit
+        self.naked = set() # Empty cells with exactly one candidate
+        self.hidden = set() # (unit, digit) pairs with exactly one cell left
+        self._dead_cells = set() # Empty cells with no candidate left
+        self._dead_units = set() # (unit, digit) pairs the digit can no longer reach
+        self._log = []
+        self._marks = []
+        for idx, n in enumerate(self.cells):
+            if n:
+                for u in self.units_of[idx]: self.placed[u] |= 1 << n
+        full = all_digits_mask(self.size)
+        for idx, n in enumerate(self.cells):
+            if n: continue
+            a, b, c = self.units_of[idx]
+            mask = full & ~(self.placed[a] | self.placed[b] | self.placed[c])
+            self.cand[idx] = mask
+            for d in _digits(mask):
+                for u in (a, b, c): self.where[u][d] += 1
+            self._touch_cell(idx)
+        for u in range(len(self.units)):
+            for d in range(1, self.size + 1): self._touch_unit(u, d)
+
+    @property
+    def broken(self): # Some empty cell or unit has run out of options
+        return bool(self._dead_cells or self._dead_units)
+
+    # --- Ready sets ---
+    def _touch_cell(self, idx):
+        mask = self.cand[idx]
+        if self.cells[idx] or mask & (mask - 1):
+            self.naked.discard(idx)
+            self._dead_cells.discard(idx)
+        elif mask:
+            self.naked.add(idx)
+            self._dead_cells.discard(idx)
+        else:
+            self.naked.discard(idx)
+            self._dead_cells.add(idx)
+
+    def _touch_unit(self, u, d):
+        count = self.where[u][d]
+        open_digit = not self.placed[u] & (1 << d)
+        if count == 1 and open_digit: self.hidden.add((u, d))
+        else: self.hidden.discard((u, d))
+        if not count and open_digit: self._dead_units.add((u, d))
+        else: self._dead_units.discard((u, d))
+
+    # --- Changes (all logged) ---
+    def _drop(self, idx, mask): # Strikes the digits in mask out of idx's candidates
+        mask &= self.cand[idx]
+        if not mask: return 0
+        self.cand[idx] ^= mask
+        self._log.append(('cand', idx, mask))
+        for d in _digits(mask):
+            for u in self.units_of[idx]:
+                self.where[u][d] -= 1
+                self._touch_unit(u, d)
+        self._touch_cell(idx)
+        return bin(mask).count('1')
+
+    def eliminate(self, idx, mask): # Number of candidates removed
+        return self._drop(idx, mask)
+
+    def place(self, idx, n):
+        self._drop(idx, self.cand[idx])
+        self.cells[idx] = n
+        self._log.append(('cell', idx, n))
+        bit = 1 << n
+        for u in self.units_of[idx]:
+            self.placed[u] |= bit
+            self._touch_unit(u, n)
+        self._touch_cell(idx)
+        for p in self.peers[idx]:
+            if not self.cells[p]: self._drop(p, bit)
+
+    def mark(self):
+        self._marks.append(len(self._log))
+
+    def undo(self): # Rolls back to the last mark(); False if there is none
+        if not self._marks: return False
+        stop = self._marks.pop()
+        while len(self._log) > stop:
+            kind, idx, value = self._log.pop()
+            if kind == 'cell':
+                self.cells[idx] = 0
+                for u in self.units_of[idx]:
+                    self.placed[u] ^= 1 << value
+                    self._touch_unit(u, value)
+            else:
+                self.cand[idx] |= value
+                for d in _digits(value):
+                    for u in self.units_of[idx]:
+                        self.where[u][d] += 1
+                        self._touch_unit(u, d)
+            self._touch_cell(idx)
+        return True
+
+    # --- Techniques ---
+    def _find_single(self): # (idx, digit, technique) or None
+        for idx in self.naked:
+            return idx, self.cand[idx].bit_length() - 1, 'naked_single'
+        for u, d in self.hidden:
+            for idx in self.units[u]:
+                if self.cand[idx] & (1 << d): return idx, d, 'hidden_single'
+        return None
+
+    def _intersections(self, technique):
+        # pointing_pair: a digit confined to one line inside a box leaves the rest of that line.
+        # box_line_reduction: a digit confined to one box inside a line leaves the rest of that box.
+        size, box = self.size, self.box
+        if technique == 'pointing_pair':
+            sources = range(2*size, 3*size)
+        else:
+            sources = range(2*size)
+        for u in sources:
+            for d in range(1, size + 1):
+                if not 2 <= self.where[u][d] <= box: continue
+                bit = 1 << d
+                spots = [idx for idx in self.units[u] if self.cand[idx] & bit]
+                if technique == 'pointing_pair':
+                    targets = {self.units_of[idx][0] for idx in spots}
+                    if len(targets) > 1: targets = {self.units_of[idx][1] for idx in spots}
+                else:
+                    targets = {self.units_of[idx][2] for idx in spots}
+                if len(targets) != 1: continue
+                target = targets.pop()
+                removed = sum(self._drop(idx, bit) for idx in self.units[target]
+                              if idx not in spots and not self.cells[idx])
+                if removed: return removed
+        return 0
+
+    def _naked_subset(self, k):
+        # k cells of a unit whose candidates together are exactly k digits
+        for unit in self.units:
+            open_cells = [idx for idx in unit if not self.cells[idx] and bin(self.cand[idx]).count('1') <= k]
+            if len(open_cells) < k: continue
+            for group in combinations(open_cells, k):
+                union = 0
+                for idx in group: union |= self.cand[idx]
+                if bin(union).count('1') != k: continue
+                removed = sum(self._drop(idx, union) for idx in unit if idx not in group and not self.cells[idx])
+                if removed: return removed
+        return 0
+
+    def _eliminate_once(self): # Applies the cheapest elimination that strikes something; its name or None
+        for technique in ELIMINATIONS:
+            if technique in _SUBSET_SIZES:
+                removed = self._naked_subset(_SUBSET_SIZES[technique])
+            else:
+                removed = self._intersections(technique)
+            if removed: return technique
+        return None
+
+    def next_hint(self):
+        # Finds the next cell that follows by logic alone. Eliminations made
+        # on the way are kept (and logged); the cell itself is not placed.
+        # Returns {'cell': (r, c), 'digit', 'technique', 'after': [eliminations]}
+        # or None when the techniques here run dry or the board is broken.
+        after = []
+        while not self.broken:
+            found = self._find_single()
+            if found:
+                idx, digit, technique = found
+                return {'cell': divmod(idx, self.size), 'digit': digit,
+                        'technique': technique, 'after': after}
+            technique = self._eliminate_once()
+            if technique is None: return None
+            after.append(technique)
+        return None
+
+    def apply_hint(self, hint): # Places the hinted digit as one undoable step
+        self.mark()
+        r, c = hint['cell']
+        self.place(r * self.size + c, hint['digit'])
+
+
+def describe_hint(hint): # "R3C5 = 7: Hidden single (after Pointing pair)"
+    r, c = hint['cell']
+    text = f"R{r+1}C{c+1} = {DIGIT_CHARS[hint['digit']]}: {TECHNIQUE_NAMES[hint['technique']]}"
+    if hint['after']:
+        text += f" (after {', '.join(TECHNIQUE_NAMES[t] for t in dict.fromkeys(hint['after']))})"
+    return text
+# --- End Logical hint engine ---
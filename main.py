@@ -1,12 +1,31 @@
-import pygame
-import random
-import copy
-from collections import deque
 import time
+STARTUP_START = time.perf_counter() # Before pygame and the solvers load, see --startup-time
+import math
+import os
+import pygame
+import sys
+
+from sudoku_core import (solve_bfs, generate_puzzle, IterativeDFS, RUNNING, SOLVED, CANCELLED,
+                         BOX_SIZES, DEFAULT_HOLES, DIGIT_CHARS, box_size, empty_grid)
+try:
+    from vector_bfs import solve_bfs_vectorized
+except ImportError: # NumPy missing, BFS falls back to the plain queue
+    solve_bfs_vectorized = None
+from portfolio import solve_auto, BFS_MAX_BOX
+from solver_worker import SolverWorker
+from rating import PuzzlePool, DIFFICULTY_ORDER
+from hints import CandidateGrid, describe_hint
+from tree_export import TreeExporter
+from profiling import FrameStats, ProfileCapture, MemoryCapture
+from assets import load_font, LazyAudio
+
+# Command line flags
+SOUND_ENABLED = '--no-sound' not in sys.argv
+STARTUP_CHECK = '--startup-time' in sys.argv # Print the time to the first frame, then quit (bench.py startup)
 
 # Constants
-GRID_SIZE    = 9
-CELL_SIZE    = 60
+GRID_SIZE    = 9  # Board currently shown: 4, 9, 16 or 25 cells a side
+CELL_SIZE    = 60 # Rescaled by set_board_box so the board always spans BOARD_PIX
 BOARD_PIX    = GRID_SIZE * CELL_SIZE
 
 # --- Layout For Side-by-Side Tree View ---
@@ -34,6 +53,13 @@ POPUP_TEXT_COLOR = (255, 255, 255)
 NUM_DELAY    = 50 
 POPUP_DURATION = 3
 
+# --- BFS View Constants ---
+BFS_HIST_WIDTH = 140 # Longest histogram bar, for the biggest level
+BFS_HIST_COLOR = ORANGE
+BFS_SAMPLE_COLOR = BLUE
+BFS_ANCESTOR_COLOR = (120, 120, 120)
+# --- End BFS View Constants ---
+
 # --- Tree Visualization Constants (adapted for live view) ---
 LIVE_TREE_NODE_RADIUS = 12 # Smaller nodes for denser tree
 LIVE_TREE_X_SPACING = 70
@@ -53,6 +79,7 @@ PLAYING      = 1
 # Music file path
 MUSIC_FILE   = 'kids-game-gaming-background-music-295075.mp3'
 COUNT_SOUND_FILE = 'bubble-pop-2-293341.mp3'
+FONT_NAME = None # pygame's built-in font; a system font name here is looked up once, see assets.font_path
 
 # --- Global variables for live DFS tree ---
 live_tree_nodes = []
@@ -60,75 +87,51 @@ _live_node_id_counter = 0
 final_solution_node_ids = set() # Set of node IDs on the final solution path for DFS
 # --- End Global live tree vars ---
 
-# Generate Random Sudoku (functions remain the same)
-def fill_diagonal_boxes(grid):
-    def fill_box(r, c):
-        nums = list(range(1, 10))
-        random.shuffle(nums)
-        for i in range(3):
-            for j in range(3):
-                grid[r+i][c+j] = nums.pop()
-    for start in (0, 3, 6):
-        fill_box(start, start)
-
-def is_valid(grid, r, c, n):
-    if any(grid[r][j] == n for j in range(9)): return False
-    if any(grid[i][c] == n for i in range(9)): return False
-    br, bc = (r//3)*3, (c//3)*3
-    for i in range(br, br+3):
-        for j in range(bc, bc+3):
-            if grid[i][j] == n: return False
-    return True
-
-def backtrack_fill(grid): # Used for initial puzzle generation
-    for i in range(9):
-        for j in range(9):
-            if grid[i][j] == 0:
-                for n in range(1, 10):
-                    if is_valid(grid, i, j, n):
-                        grid[i][j] = n
-                        if backtrack_fill(grid): return True
-                        grid[i][j] = 0
-                return False
-    return True
-
-def generate_puzzle(holes=40):
-    grid = [[0]*9 for _ in range(9)]
-    fill_diagonal_boxes(grid)
-    backtrack_fill(grid)
-    positions = [(i,j) for i in range(9) for j in range(9)]
-    random.shuffle(positions)
-    for _ in range(holes):
-        i, j = positions.pop()
-        grid[i][j] = 0
-    return grid
-
-def find_empty(grid):
-    for i in range(9):
-        for j in range(9):
-            if grid[i][j] == 0: return i, j
-    return None
-
-# Pygame Setup
-pygame.init()
-pygame.mixer.init()
-
-screen = pygame.display.set_mode((TOTAL_WIDTH, SCREEN_HEIGHT)) # Adjusted width
-pygame.display.set_caption("Sudoku Solver with Live DFS Tree")
-font         = pygame.font.SysFont(None, 40)
-button_font  = pygame.font.SysFont(None, 30)
-title_font   = pygame.font.SysFont(None, 72)
-live_tree_font = pygame.font.SysFont(None, 18) # Smaller font for tree nodes
-clock        = pygame.time.Clock()
+# --- Global state for the stepped DFS ---
+DFS_CHECKPOINT_FILE = 'dfs_checkpoint.json'
+dfs_solver = None
+dfs_next_step_time = 0 # pygame ticks when the next DFS step is due
+dfs_highlight_cell = None
+DFS_EXPORT_FILE = 'dfs_tree.jsonl.gz' # Streamed tree of the last DFS run while export is on (E key)
+tree_export_enabled = False
+dfs_exporter = None # TreeExporter for the running DFS, None when not exporting
+# --- End DFS state ---
+
+# --- Global state for background solves (BFS / Auto) ---
+solver_worker = None # SolverWorker running the current BFS/Auto job
+QUIT_WAIT = 2 # Seconds closing the window waits for a cancelled background solve to wind down
+revealing_solution = False # Worker is done, the solution is being animated in
+reveal_queue = [] # (r, c, n) still to be revealed by the solution animation
+reveal_next_time = 0 # pygame ticks when the next cell is due
+reveal_cell = None
+tree_area_message = "" # Shown in the tree area while a solve has no live tree
+bfs_view = None # Level histogram and sampled frontier of the last BFS, see draw_bfs_view
+# --- End background solve state ---
+
+# --- Performance overlay (O key) and profiling captures (P: cProfile, M: tracemalloc) ---
+PERF_PHASES = ['solve', 'tree', 'grid', 'flip'] # Stepping/draining the solver, draw_live_tree + BFS view, draw_grid_in_area, display flip
+PERF_REFRESH_MS = 250 # The overlay text is re-rendered this often, not every frame
+frame_stats = FrameStats(PERF_PHASES)
+perf_overlay_on = False
+perf_overlay_lines = [] # Rendered overlay text
+perf_overlay_next = 0 # pygame ticks when the overlay text is next refreshed
+profile_capture = None # ProfileCapture while P is on; dumped on P or when the solve ends
+memory_capture = None # MemoryCapture while M is on; likewise
+# --- End Performance overlay state ---
 
 # Button Rectangles (Adjusted for new TOTAL_WIDTH if needed, placed under GRID_RECT)
-BTN_WIDTH = 100
-BTN_GAP = 15
+BTN_WIDTH = 90
+BTN_GAP = 12
 # Buttons will be placed relative to (0, BOARD_PIX)
 dfs_btn      = pygame.Rect(BTN_GAP,  BOARD_PIX + 10, BTN_WIDTH, 40)
 bfs_btn      = pygame.Rect(dfs_btn.right + BTN_GAP, BOARD_PIX + 10, BTN_WIDTH, 40)
-reset_btn    = pygame.Rect(bfs_btn.right + BTN_GAP, BOARD_PIX + 10, BTN_WIDTH, 40)
+auto_btn     = pygame.Rect(bfs_btn.right + BTN_GAP, BOARD_PIX + 10, BTN_WIDTH, 40)
+hint_btn     = pygame.Rect(auto_btn.right + BTN_GAP, BOARD_PIX + 10, BTN_WIDTH, 40)
+reset_btn    = pygame.Rect(hint_btn.right + BTN_GAP, BOARD_PIX + 10, BTN_WIDTH, 40)
 gen_btn      = pygame.Rect(reset_btn.right + BTN_GAP, BOARD_PIX + 10, BTN_WIDTH, 40)
+cancel_btn   = pygame.Rect(gen_btn.right + BTN_GAP, BOARD_PIX + 10, BTN_WIDTH, 40)
+diff_btn     = pygame.Rect(cancel_btn.right + BTN_GAP, BOARD_PIX + 10, BTN_WIDTH, 40) # Cycles the difficulty for New
+size_btn     = pygame.Rect(diff_btn.right + BTN_GAP, BOARD_PIX + 10, BTN_WIDTH, 40) # Cycles the board size for New
 # No separate "View Tree" button as it's live
 
 # Menu Buttons
@@ -136,20 +139,6 @@ play_btn     = pygame.Rect(TOTAL_WIDTH // 2 - 75, SCREEN_HEIGHT // 2 - 30, 150,
 exit_btn     = pygame.Rect(TOTAL_WIDTH // 2 - 75, SCREEN_HEIGHT // 2 + 50, 150, 60)
 
 
-# Load Music & Sounds (remains the same)
-try:
-    pygame.mixer.music.load(MUSIC_FILE)
-    pygame.mixer.music.set_volume(0.5)
-except pygame.error as e:
-    print(f"Could not load music file: {e}")
-count_sound = None
-try:
-    count_sound = pygame.mixer.Sound(COUNT_SOUND_FILE)
-    count_sound.set_volume(0.7)
-except pygame.error as e:
-    print(f"Could not load count sound file: {e}")
-
-
 # --- Live Tree Node ID Generator ---
 def get_new_live_node_id():
     global _live_node_id_counter
@@ -158,12 +147,28 @@ def get_new_live_node_id():
 # --- End ID Generator ---
 
 
+# --- Board size ---
+board_box = 3 # Box size of the board New/Play will deal
+digit_glyphs = [] # Pre-rendered digit surfaces, index = digit; a 25x25 board blits 625 a frame
+
+def set_board_box(box): # Scales cells and digits so a box*box board fits BOARD_PIX
+    global board_box, GRID_SIZE, CELL_SIZE, digit_glyphs
+    board_box = box
+    GRID_SIZE = box * box
+    CELL_SIZE = BOARD_PIX // GRID_SIZE
+    digit_font = font if GRID_SIZE == 9 else load_font(FONT_NAME, int(CELL_SIZE * 0.75))
+    digit_glyphs = [None] + [digit_font.render(DIGIT_CHARS[n], True, BLACK) for n in range(1, GRID_SIZE + 1)]
+# --- End Board size ---
+
+
 # --- Drawing Functions ---
 def draw_grid_in_area(grid_data, highlight_cell, area_rect):
     # Erase previous grid area - done by redraw_entire_solving_screen
     # pygame.draw.rect(screen, WHITE, area_rect) # Fill grid background
-    for i in range(9):
-        for j in range(9):
+    size = len(grid_data)
+    box = box_size(grid_data)
+    for i in range(size):
+        for j in range(size):
             x_abs = area_rect.left + j * CELL_SIZE
             y_abs = area_rect.top + i * CELL_SIZE
             
@@ -173,17 +178,18 @@ def draw_grid_in_area(grid_data, highlight_cell, area_rect):
             
             num = grid_data[i][j]
             if num != 0:
-                txt_surf = font.render(str(num), True, BLACK)
-                screen.blit(txt_surf, (x_abs + 20, y_abs + 10))
+                txt_surf = digit_glyphs[num]
+                screen.blit(txt_surf, txt_surf.get_rect(center=(x_abs + CELL_SIZE//2, y_abs + CELL_SIZE//2)))
     
-    for i in range(10): # Draw grid lines
-        line_width = 3 if i % 3 == 0 else 1
+    edge = size * CELL_SIZE # Cells are whole pixels, so 16x16 and 25x25 stop a little short of BOARD_PIX
+    for i in range(size + 1): # Draw grid lines
+        line_width = 3 if i % box == 0 else 1
         # Horizontal lines
         pygame.draw.line(screen, BLACK, (area_rect.left, area_rect.top + i * CELL_SIZE), \
-                         (area_rect.right, area_rect.top + i * CELL_SIZE), line_width)
+                         (area_rect.left + edge, area_rect.top + i * CELL_SIZE), line_width)
         # Vertical lines
         pygame.draw.line(screen, BLACK, (area_rect.left + i * CELL_SIZE, area_rect.top), \
-                         (area_rect.left + i * CELL_SIZE, area_rect.bottom), line_width)
+                         (area_rect.left + i * CELL_SIZE, area_rect.top + edge), line_width)
 
 def draw_live_tree(tree_nodes_list, display_rect, solved_node_ids):
     # Erase previous tree area - done by redraw_entire_solving_screen
@@ -250,13 +256,32 @@ def draw_main_buttons(mouse_pos, mouse_click_state): # For buttons under grid/tr
     pygame.draw.rect(screen, color_dfs, dfs_btn)
     screen.blit(button_font.render("DFS", True, WHITE), (dfs_btn.x + BTN_WIDTH//2 - 20, dfs_btn.y + 10))
 
-    # BFS Button
-    color_bfs = ORANGE
-    if bfs_btn.collidepoint(mouse_pos): color_bfs = HOVER_COLOR
-    if bfs_btn.collidepoint(mouse_pos) and mouse_click_state[0]: color_bfs = CLICK_COLOR
+    # BFS Button (gray on boards whose frontiers would not fit in memory)
+    color_bfs = GRAY
+    if board_box <= BFS_MAX_BOX:
+        color_bfs = ORANGE
+        if bfs_btn.collidepoint(mouse_pos): color_bfs = HOVER_COLOR
+        if bfs_btn.collidepoint(mouse_pos) and mouse_click_state[0]: color_bfs = CLICK_COLOR
     pygame.draw.rect(screen, color_bfs, bfs_btn)
     screen.blit(button_font.render("BFS", True, WHITE), (bfs_btn.x + BTN_WIDTH//2 - 20, bfs_btn.y + 10))
 
+    # Auto Button (portfolio of engines)
+    color_auto = ORANGE
+    if auto_btn.collidepoint(mouse_pos): color_auto = HOVER_COLOR
+    if auto_btn.collidepoint(mouse_pos) and mouse_click_state[0]: color_auto = CLICK_COLOR
+    pygame.draw.rect(screen, color_auto, auto_btn)
+    screen.blit(button_font.render("Auto", True, WHITE), (auto_btn.x + BTN_WIDTH//2 - 24, auto_btn.y + 10))
+
+    # Hint Button (gray once a solver has taken over the board)
+    color_hint = GRAY
+    if hint_grid is not None and not is_solving:
+        color_hint = GREEN
+        if hint_btn.collidepoint(mouse_pos): color_hint = (100,255,100)
+        if hint_btn.collidepoint(mouse_pos) and mouse_click_state[0]: color_hint = (0,150,0)
+    pygame.draw.rect(screen, color_hint, hint_btn)
+    hint_text = button_font.render("Hint", True, WHITE)
+    screen.blit(hint_text, hint_text.get_rect(center=hint_btn.center))
+
     # Reset Button
     color_reset = RED
     if reset_btn.collidepoint(mouse_pos): color_reset = (255,100,100)
@@ -271,6 +296,31 @@ def draw_main_buttons(mouse_pos, mouse_click_state): # For buttons under grid/tr
     pygame.draw.rect(screen, color_gen, gen_btn)
     screen.blit(button_font.render("New", True, WHITE), (gen_btn.x + BTN_WIDTH//2 - 22, gen_btn.y + 10))
 
+    # Cancel Button (only live while a solve is running)
+    color_cancel = GRAY
+    if is_solving:
+        color_cancel = RED
+        if cancel_btn.collidepoint(mouse_pos): color_cancel = (255,100,100)
+        if cancel_btn.collidepoint(mouse_pos) and mouse_click_state[0]: color_cancel = (180,0,0)
+    pygame.draw.rect(screen, color_cancel, cancel_btn)
+    screen.blit(button_font.render("Cancel", True, WHITE), (cancel_btn.x + BTN_WIDTH//2 - 33, cancel_btn.y + 10))
+
+    # Difficulty Button (shows the band New will use)
+    color_diff = BLUE
+    if diff_btn.collidepoint(mouse_pos): color_diff = (140,140,255)
+    if diff_btn.collidepoint(mouse_pos) and mouse_click_state[0]: color_diff = (60,60,200)
+    pygame.draw.rect(screen, color_diff, diff_btn)
+    diff_text = button_font.render(difficulty if board_box == 3 else "-", True, WHITE) # Ratings are 9x9 only
+    screen.blit(diff_text, diff_text.get_rect(center=diff_btn.center))
+
+    # Size Button (shows the board New will deal)
+    color_size = BLUE
+    if size_btn.collidepoint(mouse_pos): color_size = (140,140,255)
+    if size_btn.collidepoint(mouse_pos) and mouse_click_state[0]: color_size = (60,60,200)
+    pygame.draw.rect(screen, color_size, size_btn)
+    size_text = button_font.render(f"{GRID_SIZE}x{GRID_SIZE}", True, WHITE)
+    screen.blit(size_text, size_text.get_rect(center=size_btn.center))
+
 def draw_menu_screen(mouse_pos, mouse_click_state): # Adjusted for new screen size
     screen.fill(GRAY)
     title_text = title_font.render("Sudoku Solver", True, BLACK)
@@ -291,130 +341,394 @@ def draw_menu_screen(mouse_pos, mouse_click_state): # Adjusted for new screen si
     exit_text = button_font.render("Exit", True, WHITE)
     screen.blit(exit_text, exit_text.get_rect(center=exit_btn.center))
 
-def draw_popup_message(message_str): # Standard popup
-    popup_surf = pygame.Surface((TOTAL_WIDTH * 0.5, SCREEN_HEIGHT * 0.2), pygame.SRCALPHA)
-    popup_surf.fill(POPUP_BG_COLOR)
+def draw_popup_message(message_str): # Standard popup, widened for long hint texts
     popup_text_surf = font.render(message_str, True, POPUP_TEXT_COLOR)
+    popup_surf = pygame.Surface((max(TOTAL_WIDTH * 0.5, popup_text_surf.get_width() + 40), SCREEN_HEIGHT * 0.2), pygame.SRCALPHA)
+    popup_surf.fill(POPUP_BG_COLOR)
     text_rect = popup_text_surf.get_rect(center=(popup_surf.get_width()//2, popup_surf.get_height()//2))
     popup_surf.blit(popup_text_surf, text_rect)
     screen.blit(popup_surf, popup_surf.get_rect(center=(TOTAL_WIDTH//2, SCREEN_HEIGHT//2)))
 
 
+# --- BFS View (level histogram + sampled frontier with ancestry) ---
+# The solver sends one count and a bounded sample per level, so everything
+# here is sized by the number of levels and SAMPLE_SIZE, never by the frontier.
+def new_bfs_view(puzzle):
+    holes = sum(row.count(0) for row in puzzle)
+    return {'counts': [], 'levels': holes + 1, 'edges': [], 'ancestors': [], 'leaves': []}
+
+def bfs_level_y(view, depth, rect):
+    row_height = (rect.height - 60) / view['levels']
+    return int(rect.top + 45 + depth * row_height)
+
+def layout_bfs_sample(view, depth, paths, rect):
+    # Leaves spread evenly across the right part of the view; each ancestor
+    # (a prefix shared by some sampled paths) sits above its leaves' mean x.
+    left, right = rect.left + BFS_HIST_WIDTH + 40, rect.right - 15
+    leaves = sorted(set(paths))
+    xs = {}
+    for i, path in enumerate(leaves):
+        x = left + (i + 0.5) * (right - left) / len(leaves)
+        for k in range(depth + 1):
+            xs.setdefault(path[:k], []).append(x)
+    pos = {prefix: (int(sum(x_list) / len(x_list)), bfs_level_y(view, len(prefix), rect)) for prefix, x_list in xs.items()}
+    view['edges'] = [(pos[prefix[:-1]], p) for prefix, p in pos.items() if prefix]
+    view['ancestors'] = [p for prefix, p in pos.items() if len(prefix) < depth]
+    view['leaves'] = [pos[path] for path in leaves]
+
+def draw_bfs_view(view, rect):
+    counts = view['counts']
+    if counts:
+        biggest = max(counts)
+        scale = BFS_HIST_WIDTH / math.log10(biggest + 1) if biggest > 1 else 0
+        bar_height = max(1, int((rect.height - 60) / view['levels']) - 1)
+        for depth, count in enumerate(counts): # Log scale, frontiers span orders of magnitude
+            width = max(1, int(math.log10(count + 1) * scale)) if count else 0
+            pygame.draw.rect(screen, BFS_HIST_COLOR, (rect.left + 10, bfs_level_y(view, depth, rect), width, bar_height))
+        label = live_tree_font.render(f"peak {biggest} boards, level {counts.index(biggest)}", True, BLACK)
+        screen.blit(label, (rect.left + 10, rect.bottom - 14))
+    for start, end in view['edges']:
+        pygame.draw.line(screen, LIVE_TREE_LINE_COLOR, start, end, 1)
+    for p in view['ancestors']:
+        pygame.draw.circle(screen, BFS_ANCESTOR_COLOR, p, 2)
+    for p in view['leaves']:
+        pygame.draw.circle(screen, BFS_SAMPLE_COLOR, p, 4)
+# --- End BFS View ---
+
+
 # --- Central Drawing Function for Solving Screen (Grid + Tree + Buttons) ---
 def redraw_entire_solving_screen(current_grid, highlight_coord, tree_data, solved_nodes, mouse_pos, mouse_clicks):
     screen.fill(WHITE) # Background for the whole solving area (grid + tree)
     pygame.draw.rect(screen, (230,230,250), TREE_DISPLAY_RECT) # Light background for tree area
 
+    frame_stats.start()
     draw_grid_in_area(current_grid, highlight_coord, GRID_RECT)
+    frame_stats.stop('grid')
+    frame_stats.start()
     draw_live_tree(tree_data, TREE_DISPLAY_RECT, solved_nodes)
+    if bfs_view is not None: draw_bfs_view(bfs_view, TREE_DISPLAY_RECT)
+    frame_stats.stop('tree')
     draw_main_buttons(mouse_pos, mouse_clicks) # Buttons drawn last, on top of everything if they overlap BOARD_PIX level
     # Note: Buttons are drawn in their own area below BOARD_PIX based on current rects.
     # If they were to overlap, this order matters.
 # --- End Central Drawing ---
 
 
-# --- DFS Solver with Integrated Live Tree Building & Drawing ---
-def solve_dfs_with_live_tree(current_grid, parent_tree_node_id, depth, solved_node_ids_set):
-    global live_tree_nodes, _live_node_id_counter # Use globals
-
-    # Handle pygame events to keep window responsive & allow quit
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            exit() # Exit gracefully
-
-    empty_cell = find_empty(current_grid)
-    if not empty_cell: # Solved
-        return True
-
-    r, c = empty_cell
-    original_val = current_grid[r][c] # Should be 0
-
-    # Add this exploration level (cell (r,c)) as a conceptual parent if not already represented
-    # For simplicity, each number tried will be a child of 'parent_tree_node_id'
-
-    for n in range(1, 10):
-        if is_valid(current_grid, r, c, n):
-            current_grid[r][c] = n
-            if count_sound: count_sound.play()
-
-            node_id = get_new_live_node_id()
-            live_tree_nodes.append({
-                'id': node_id, 'parent_id': parent_tree_node_id,
-                'label': f'({r},{c})={n}', 'depth': depth,
-                'status': 'trying', # Will be updated
-            })
-            
-            # Redraw everything
-            redraw_entire_solving_screen(current_grid, (r,c), live_tree_nodes, solved_node_ids_set, pygame.mouse.get_pos(), pygame.mouse.get_pressed())
-            pygame.display.flip()
-            pygame.time.delay(NUM_DELAY)
-
-            if solve_dfs_with_live_tree(current_grid, node_id, depth + 1, solved_node_ids_set):
-                solved_node_ids_set.add(node_id) # This node is on solution path
-                # Find and update status in list (less efficient but ok for few nodes)
-                for node_obj in live_tree_nodes:
-                    if node_obj['id'] == node_id: node_obj['status'] = 'solution'; break
-                return True # Propagate success up
-
-            # Backtrack
-            current_grid[r][c] = original_val # Reset cell
-            if count_sound: count_sound.play()
-            # Update node status to backtracked
-            for node_obj in live_tree_nodes:
-                if node_obj['id'] == node_id: node_obj['status'] = 'backtracked'; break
-            
-            # Redraw after backtrack
-            redraw_entire_solving_screen(current_grid, (r,c), live_tree_nodes, solved_node_ids_set, pygame.mouse.get_pos(), pygame.mouse.get_pressed())
-            pygame.display.flip()
-            pygame.time.delay(NUM_DELAY)
-            
-    return False # No number worked for this cell (r,c)
-# --- End DFS Solver ---
-
-
-# BFS Solver (remains mostly for animation, no live tree for BFS yet)
-def solve_bfs_for_animation(initial_grid_state):
-    queue = deque([initial_grid_state])
-    visited_bfs_solve = {tuple(map(tuple, initial_grid_state))}
-
-    while queue:
-        current_grid_bfs = queue.popleft()
-        empty_cell = find_empty(current_grid_bfs)
-        if not empty_cell: return current_grid_bfs
-        r, c = empty_cell
-        for n in range(1, 10):
-            if is_valid(current_grid_bfs, r, c, n):
-                new_grid_bfs = copy.deepcopy(current_grid_bfs)
-                new_grid_bfs[r][c] = n
-                new_grid_key = tuple(map(tuple, new_grid_bfs))
-                if new_grid_key not in visited_bfs_solve:
-                    visited_bfs_solve.add(new_grid_key)
-                    queue.append(new_grid_bfs)
-    return None
-
-def animate_bfs_solution(grid_to_animate_on, solution_grid): # For BFS
-    # For BFS, tree is not shown live. Grid animation only.
-    for i in range(9):
-        for j in range(9):
-            if grid_to_animate_on[i][j] == 0 and solution_grid[i][j] != 0:
-                grid_to_animate_on[i][j] = solution_grid[i][j]
-                if count_sound: count_sound.play()
-                
-                # Redraw only grid and buttons for BFS animation
-                screen.fill(WHITE) # Clear screen
-                draw_grid_in_area(grid_to_animate_on, (i,j), GRID_RECT)
-                # Optionally, draw a placeholder or message in TREE_DISPLAY_RECT for BFS
-                bfs_msg_surf = font.render("BFS Solving (No Live Tree)", True, BLACK)
-                screen.blit(bfs_msg_surf, bfs_msg_surf.get_rect(center=TREE_DISPLAY_RECT.center))
-                draw_main_buttons(pygame.mouse.get_pos(), pygame.mouse.get_pressed())
-                pygame.display.flip()
-                pygame.time.delay(NUM_DELAY)
+# --- Performance overlay ---
+def live_tree_bytes(): # Rough size of the live tree: every node costs about what the newest one does
+    if not live_tree_nodes: return 0
+    node = live_tree_nodes[-1]
+    per_node = sys.getsizeof(node) + sum(sys.getsizeof(v) for v in node.values())
+    return sys.getsizeof(live_tree_nodes) + per_node * len(live_tree_nodes)
+
+def refresh_perf_overlay():
+    global perf_overlay_lines
+    frame_ms, worst_ms, phase_ms = frame_stats.averages()
+    lines = [f"frame {frame_ms:.1f} ms (worst {worst_ms:.1f}), {clock.get_fps():.0f} FPS",
+             "  ".join(f"{name} {phase_ms[name]:.2f}" for name in PERF_PHASES) + " ms",
+             f"tree {len(live_tree_nodes)} nodes, ~{live_tree_bytes() / 1024:.0f} KB"]
+    capturing = [name for name, capture in (('cProfile', profile_capture), ('tracemalloc', memory_capture)) if capture]
+    if capturing: lines.append("capturing: " + ", ".join(capturing))
+    perf_overlay_lines = [live_tree_font.render(line, True, WHITE) for line in lines]
+
+def draw_perf_overlay():
+    global perf_overlay_next
+    if pygame.time.get_ticks() >= perf_overlay_next:
+        refresh_perf_overlay()
+        perf_overlay_next = pygame.time.get_ticks() + PERF_REFRESH_MS
+    width = max(surf.get_width() for surf in perf_overlay_lines) + 12
+    panel = pygame.Surface((width, 14 * len(perf_overlay_lines) + 8), pygame.SRCALPHA)
+    panel.fill((0, 0, 0, 170))
+    for i, surf in enumerate(perf_overlay_lines): panel.blit(surf, (6, 4 + 14 * i))
+    screen.blit(panel, (4, 4))
+
+def toggle_profile_capture():
+    global profile_capture
+    if profile_capture is None:
+        profile_capture = ProfileCapture()
+        show_popup("cProfile on until P or the end of the next solve")
+    else:
+        show_popup(f"Profile written to {profile_capture.dump()}")
+        profile_capture = None
+
+def toggle_memory_capture():
+    global memory_capture
+    if memory_capture is None:
+        memory_capture = MemoryCapture()
+        show_popup("tracemalloc on until M or the end of the next solve")
+    else:
+        show_popup(f"Memory report written to {memory_capture.dump()}")
+        memory_capture = None
+
+def stop_captures(): # Dumps whatever capture is running; the report names go to the console
+    global profile_capture, memory_capture
+    if profile_capture: print(f"Profile written to {profile_capture.dump()}")
+    if memory_capture: print(f"Memory report written to {memory_capture.dump()}")
+    profile_capture = memory_capture = None
+# --- End Performance overlay ---
+
+
+# --- DFS Solver Driver (IterativeDFS stepped from the main loop) ---
+# The solver does one try/backtrack per step; these helpers mirror each step
+# into the live tree. The grid on screen is the solver's own grid, and the
+# tree nodes of the current path ride on its trail (solver.state).
+def start_live_tree(solver, root_label):
+    global live_tree_nodes, _live_node_id_counter, final_solution_node_ids, bfs_view
+    live_tree_nodes = []
+    bfs_view = None
+    _live_node_id_counter = 0
+    final_solution_node_ids = set()
+    root_node = {'id': get_new_live_node_id(), 'parent_id': None,
+                 'label': root_label, 'depth': 0, 'status': 'root'}
+    live_tree_nodes.append(root_node)
+    solver.state.root = root_node
+    start_tree_export(root_node)
+
+def add_live_tree_node(state, r, c, n, depth):
+    node = {'id': get_new_live_node_id(), 'parent_id': state.node(depth-1)['id'],
+            'label': f'({r},{c})={n}', 'depth': depth,
+            'status': 'trying'} # Will be updated
+    live_tree_nodes.append(node)
+    state.tag(node, depth)
+    if dfs_exporter: dfs_exporter.add_node(node['id'], node['parent_id'], node['label'], depth)
+
+def apply_dfs_event(event):
+    global dfs_highlight_cell
+    kind, r, c, n, depth = event
+    if kind == 'try':
+        add_live_tree_node(dfs_solver.state, r, c, n, depth)
+    else: # Backtrack
+        node = dfs_solver.undone_node
+        node['status'] = 'backtracked'
+        if dfs_exporter: dfs_exporter.set_status(node['id'], 'backtracked')
+    dfs_highlight_cell = (r, c)
+    audio.pop()
+
+def mark_dfs_solution_path():
+    final_solution_node_ids.add(dfs_solver.state.root['id'])
+    for node in dfs_solver.state.nodes:
+        final_solution_node_ids.add(node['id'])
+        node['status'] = 'solution'
+        if dfs_exporter: dfs_exporter.set_status(node['id'], 'solution')
+
+def start_tree_export(root_node): # Opens a fresh export for this run when export is on
+    global dfs_exporter
+    stop_tree_export()
+    if not tree_export_enabled: return
+    dfs_exporter = TreeExporter(DFS_EXPORT_FILE)
+    dfs_exporter.add_node(root_node['id'], None, root_node['label'], 0, 'root')
+
+def stop_tree_export():
+    global dfs_exporter
+    if dfs_exporter is None: return
+    dfs_exporter.close()
+    print(f"DFS tree: {dfs_exporter.nodes} nodes written to {DFS_EXPORT_FILE}")
+    dfs_exporter = None
+
+def load_dfs_checkpoint(path):
+    # Rebuilds the solver and the live path to the saved stack (earlier dead ends are not kept)
+    solver = IterativeDFS.load_checkpoint(path)
+    start_live_tree(solver, 'DFS Root')
+    for depth, (r, c, n) in enumerate(solver.path(), start=1):
+        add_live_tree_node(solver.state, r, c, n, depth)
+    return solver
+# --- End DFS Solver Driver ---
+
+
+# --- Background solve jobs (run on a SolverWorker thread, never touch pygame) ---
+def bfs_job(worker, grid):
+    def on_level(depth, frontier_size):
+        worker.post_progress('level', (depth, frontier_size))
+    def on_sample(depth, paths):
+        worker.post_progress('sample', (depth, paths))
+    if solve_bfs_vectorized: # Whole levels at once when NumPy is available
+        return solve_bfs_vectorized(grid, on_level, worker.should_stop, on_sample), "BFS"
+    return solve_bfs([row[:] for row in grid], worker.should_stop, on_level, on_sample), "BFS"
+
+def auto_job(worker, grid):
+    # Races the engines (or runs the known favourite for this clue count)
+    solution, engine, _, _ = solve_auto(grid, should_stop=worker.should_stop)
+    return solution, engine
+
+def start_background_solve(method, job):
+    global solve_method, is_solving, is_solved, timer_start_time, current_grid_state
+    global live_tree_nodes, final_solution_node_ids, solver_worker, reveal_queue, tree_area_message, revealing_solution
+    global bfs_view
+    solve_method = method
+    is_solving = True
+    is_solved = False
+    timer_start_time = time.perf_counter()
+    current_grid_state = [row[:] for row in original_puzzle] # Fresh copy
+    live_tree_nodes = [] # BFS and Auto have no live tree
+    bfs_view = new_bfs_view(original_puzzle) if method == "BFS" else None
+    drop_hints()
+    final_solution_node_ids = set()
+    reveal_queue = []
+    revealing_solution = False
+    tree_area_message = f"{method} Solving..."
+    if profile_capture: job = profile_capture.wrap(job) # Before 3.12 cProfile only sees the thread it runs on
+    solver_worker = SolverWorker(job, [row[:] for row in original_puzzle])
+
+def finish_solve(outcome):
+    global is_solving, solve_time_duration, popup_message_text, popup_active_flag, popup_disappear_time
+    global solver_worker, reveal_queue, revealing_solution, reveal_cell
+    is_solving = False
+    stop_tree_export()
+    stop_captures()
+    solver_worker = None
+    reveal_queue = []
+    revealing_solution = False
+    reveal_cell = None
+    solve_time_duration = time.perf_counter() - timer_start_time
+    popup_message_text = f"{solve_method}: {outcome} in {solve_time_duration:.3f}s"
+    popup_active_flag = True
+    popup_disappear_time = time.time() + POPUP_DURATION
+
+def cancel_solve():
+    if solve_method == "DFS":
+        dfs_solver.cancel() # The main loop notices on its next step
+        return
+    if solver_worker is not None: solver_worker.cancel()
+    finish_solve("Cancelled")
+
+def handle_worker_events():
+    # Applies whatever the worker posted since last frame; never waits on it
+    global reveal_queue, reveal_next_time, tree_area_message, solve_method, revealing_solution
+    for kind, payload in solver_worker.drain():
+        if kind == 'level':
+            depth, frontier_size = payload
+            tree_area_message = f"{solve_method} level {depth}: {frontier_size} boards"
+            if bfs_view is not None:
+                counts = bfs_view['counts']
+                counts.extend([0] * (depth + 1 - len(counts))) # A dropped update leaves an empty bar
+                counts[depth] = frontier_size
+        elif kind == 'sample':
+            if bfs_view is not None: layout_bfs_sample(bfs_view, *payload, TREE_DISPLAY_RECT)
+        elif kind == 'error':
+            print(f"{solve_method} solver failed: {payload}")
+            finish_solve("Error")
+            return
+        elif kind == 'done':
+            solution_grid, engine = payload
+            if solve_method == "Auto" and engine: solve_method = f"Auto ({engine})"
+            if solution_grid is None:
+                finish_solve("No Solution")
+                return
+            tree_area_message = f"{solve_method} Solved"
+            size = len(solution_grid)
+            reveal_queue = [(i, j, solution_grid[i][j]) for i in range(size) for j in range(size)
+                            if current_grid_state[i][j] == 0 and solution_grid[i][j] != 0]
+            reveal_next_time = 0
+            revealing_solution = True
+            return
+
+def advance_reveal_animation():
+    # Fills in one solved cell per NUM_DELAY, the way the BFS animation always has
+    global is_solved, reveal_next_time, reveal_cell
+    if pygame.time.get_ticks() < reveal_next_time: return
+    if not reveal_queue:
+        is_solved = True
+        finish_solve("Solved")
+        return
+    i, j, n = reveal_queue.pop(0)
+    current_grid_state[i][j] = n
+    reveal_cell = (i, j)
+    audio.pop()
+    reveal_next_time = pygame.time.get_ticks() + NUM_DELAY
+# --- End Background solve jobs ---
+
+
+# --- Rated puzzles ---
+PUZZLE_CORPUS_FILE = 'puzzles.sudc' # Rated corpus the New button draws from when present, see corpus.py
+difficulty = "Medium" # Band used by New/Play, cycled by the difficulty button
+puzzle_corpus = None
+puzzle_pool = None # PuzzlePool, started with the game
+puzzle_pending = False # The band had nothing ready; the board stays blank until the pool digs one
+
+def new_rated_puzzle(): # None while the pool is still digging the band's first puzzle
+    if board_box != 3: # Ratings and the pool are 9x9 only, other sizes get random holes
+        return generate_puzzle(holes=DEFAULT_HOLES[board_box], box=board_box)
+    puzzle = puzzle_pool.get(difficulty)
+    return puzzle[0] if puzzle else None
+
+def show_puzzle(grid):
+    global original_puzzle, current_grid_state, is_solving, is_solved, popup_active_flag, live_tree_nodes, bfs_view
+    original_puzzle = grid
+    current_grid_state = [row[:] for row in grid]
+    reset_hints(grid)
+    is_solving = is_solved = False
+    popup_active_flag = False
+    live_tree_nodes = [] # Clear tree
+    bfs_view = None
+
+def show_new_puzzle():
+    global puzzle_pending
+    grid = new_rated_puzzle()
+    puzzle_pending = grid is None
+    show_puzzle(empty_grid(board_box) if puzzle_pending else grid)
+    if puzzle_pending: drop_hints()
+
+def poll_pending_puzzle(): # Called every frame while puzzle_pending
+    global puzzle_pending
+    grid = new_rated_puzzle()
+    if grid is None: return
+    puzzle_pending = False
+    show_puzzle(grid)
+# --- End Rated puzzles ---
+
+
+# --- Hints ---
+# The candidate grid follows the board through every hint, so a hint only
+# costs the local updates around the last placed cell. A solver taking over
+# the board drops it until the board is reset or replaced.
+hint_grid = None
+hint_cells = [] # (r, c) of each hint placed, newest last, for undo
+hint_cell = None
+
+def reset_hints(grid):
+    global hint_grid, hint_cells, hint_cell
+    hint_grid = CandidateGrid(grid)
+    hint_cells = []
+    hint_cell = None
+
+def drop_hints():
+    global hint_grid, hint_cell
+    hint_grid = None
+    hint_cell = None
+
+def show_popup(message):
+    global popup_message_text, popup_active_flag, popup_disappear_time
+    popup_message_text = message
+    popup_active_flag = True
+    popup_disappear_time = time.time() + POPUP_DURATION
+
+def give_hint():
+    global hint_cell
+    hint = hint_grid.next_hint()
+    if hint is None:
+        show_popup("No solution from here" if hint_grid.broken else "No hint: needs harder techniques")
+        return
+    hint_grid.apply_hint(hint)
+    r, c = hint['cell']
+    current_grid_state[r][c] = hint['digit']
+    hint_cells.append((r, c))
+    hint_cell = (r, c)
+    audio.pop()
+    show_popup(describe_hint(hint))
+
+def undo_hint():
+    global hint_cell
+    if not hint_cells: return
+    hint_grid.undo()
+    r, c = hint_cells.pop()
+    current_grid_state[r][c] = 0
+    hint_cell = hint_cells[-1] if hint_cells else None
+# --- End Hints ---
 
 
 # Main Loop
-original_puzzle = generate_puzzle(holes=40)
-current_grid_state = [row[:] for row in original_puzzle]
+original_puzzle = None # The first puzzle is drawn from the pool when Play is clicked
+current_grid_state = None
 is_solving = False
 is_solved = False
 solve_method = None # "DFS" or "BFS"
@@ -427,116 +741,197 @@ popup_active_flag = False
 popup_message_text = ""
 popup_disappear_time = 0.0
 
-if current_game_state == MENU and not pygame.mixer.music.get_busy():
-    try: pygame.mixer.music.play(-1)
-    except pygame.error as e: print(f"Music error: {e}")
-
-while game_running:
-    current_mouse_pos = pygame.mouse.get_pos()
-    current_mouse_clicks = pygame.mouse.get_pressed()
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            game_running = False
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1: # Left click
-                if current_game_state == MENU:
-                    if play_btn.collidepoint(event.pos):
-                        current_game_state = PLAYING
-                        pygame.mixer.music.stop()
-                        original_puzzle = generate_puzzle(holes=40)
-                        current_grid_state = [row[:] for row in original_puzzle]
-                        is_solving = is_solved = False
-                        popup_active_flag = False
-                    elif exit_btn.collidepoint(event.pos):
-                        game_running = False
-                elif current_game_state == PLAYING:
-                    if popup_active_flag: # Click dismisses popup
-                        popup_active_flag = False
-                    
-                    if not is_solving: # Process buttons only if not already solving
-                        if dfs_btn.collidepoint(event.pos):
-                            solve_method = "DFS"
-                            is_solving = True # This will now trigger the live solve in main draw loop
-                            is_solved = False
-                            timer_start_time = time.perf_counter()
-                            current_grid_state = [row[:] for row in original_puzzle] # Solve on a fresh copy
-
-                            # Initialize DFS live tree
-                            live_tree_nodes = []
-                            _live_node_id_counter = 0
-                            final_solution_node_ids = set()
-                            root_node_id = get_new_live_node_id()
-                            live_tree_nodes.append({'id': root_node_id, 'parent_id': None, 
-                                                    'label': 'DFS Root', 'depth': 0, 'status': 'root'})
-                            
-                            # The actual solving and drawing is now driven by solve_dfs_with_live_tree
-                            # This call will block until solved or fully explored by the function
-                            solution_was_found_dfs = solve_dfs_with_live_tree(current_grid_state, root_node_id, 1, final_solution_node_ids)
-                            is_solved = solution_was_found_dfs
-                            if solution_was_found_dfs:
-                                final_solution_node_ids.add(root_node_id) # Add root to solution path
-
-                            is_solving = False # Mark as finished solving
-                            solve_time_duration = time.perf_counter() - timer_start_time
-                            popup_message_text = f"DFS: {'Solved' if is_solved else 'No Solution'} in {solve_time_duration:.3f}s"
-                            popup_active_flag = True
-                            popup_disappear_time = time.time() + POPUP_DURATION
-
-                        elif bfs_btn.collidepoint(event.pos):
-                            solve_method = "BFS"
-                            is_solving = True # Regular BFS animation will run
-                            is_solved = False
-                            timer_start_time = time.perf_counter()
-                            current_grid_state = [row[:] for row in original_puzzle] # Fresh copy
-                            
-                            # BFS does not use the live tree in this version
-                            live_tree_nodes = [] # Clear any DFS tree
-                            final_solution_node_ids = set()
-
-                            solution_grid_bfs = solve_bfs_for_animation(copy.deepcopy(current_grid_state))
-                            if solution_grid_bfs:
-                                animate_bfs_solution(current_grid_state, solution_grid_bfs)
-                                is_solved = True
-                            
-                            is_solving = False
-                            solve_time_duration = time.perf_counter() - timer_start_time
-                            popup_message_text = f"BFS: {'Solved' if is_solved else 'No Solution'} in {solve_time_duration:.3f}s"
-                            popup_active_flag = True
-                            popup_disappear_time = time.time() + POPUP_DURATION
-
-                        elif reset_btn.collidepoint(event.pos):
-                            current_grid_state = [row[:] for row in original_puzzle]
-                            is_solving = is_solved = False
+first_frame_shown = False
+
+# Everything below opens the window, starts the background threads and runs
+# the game. Portfolio races start their engine processes with the spawn
+# method on Windows and macOS, and those processes import this file again,
+# so none of it may run on import.
+if __name__ == '__main__':
+    pygame.init()
+    screen = pygame.display.set_mode((TOTAL_WIDTH, SCREEN_HEIGHT)) # Adjusted width
+    pygame.display.set_caption("Sudoku Solver with Live DFS Tree")
+    font         = load_font(FONT_NAME, 40)
+    button_font  = load_font(FONT_NAME, 30)
+    title_font   = load_font(FONT_NAME, 72)
+    live_tree_font = load_font(FONT_NAME, 18) # Smaller font for tree nodes
+    clock        = pygame.time.Clock()
+    set_board_box(board_box)
+
+    # Music & Sounds, decoded on a background thread so the menu comes up first (--no-sound skips them)
+    audio = LazyAudio(MUSIC_FILE, COUNT_SOUND_FILE, SOUND_ENABLED)
+
+    if os.path.exists(PUZZLE_CORPUS_FILE): # Built with corpus.py --rate; otherwise puzzles are dug as before
+        from corpus import Corpus
+        try: puzzle_corpus = Corpus(PUZZLE_CORPUS_FILE)
+        except ValueError as e: print(f"Ignoring puzzle corpus: {e}")
+    puzzle_pool = PuzzlePool(bands=[difficulty], corpus=puzzle_corpus) # Other bands join the pool once picked
+
+    while game_running:
+        frame_stats.begin_frame()
+        current_mouse_pos = pygame.mouse.get_pos()
+        current_mouse_clicks = pygame.mouse.get_pressed()
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                game_running = False
+                quitting_worker = solver_worker
+                if is_solving: cancel_solve()
+                # A race's engine processes would hold up the interpreter's exit; let the job kill them first
+                if quitting_worker is not None: quitting_worker.join(QUIT_WAIT)
+            elif event.type == pygame.KEYDOWN and current_game_state == PLAYING:
+                # DFS controls: Space pause/resume, Esc cancel, S save checkpoint, L load checkpoint, E tree export
+                # O performance overlay, P cProfile capture, M tracemalloc capture
+                if event.key == pygame.K_SPACE and is_solving and solve_method == "DFS":
+                    if dfs_solver.paused: dfs_solver.resume()
+                    else: dfs_solver.pause()
+                    popup_message_text = "DFS Paused" if dfs_solver.paused else "DFS Resumed"
+                    popup_active_flag = True
+                    popup_disappear_time = time.time() + POPUP_DURATION
+                elif event.key == pygame.K_ESCAPE and is_solving: # Cancels any solve
+                    cancel_solve()
+                elif event.key == pygame.K_s and dfs_solver is not None and solve_method == "DFS":
+                    dfs_solver.save_checkpoint(DFS_CHECKPOINT_FILE)
+                    popup_message_text = f"DFS saved at step {dfs_solver.steps}"
+                    popup_active_flag = True
+                    popup_disappear_time = time.time() + POPUP_DURATION
+                elif event.key == pygame.K_e: # Streams the next DFS runs' trees to DFS_EXPORT_FILE
+                    tree_export_enabled = not tree_export_enabled
+                    show_popup(f"Tree export {'on' if tree_export_enabled else 'off'} from next DFS")
+                elif event.key == pygame.K_o:
+                    perf_overlay_on = not perf_overlay_on
+                    perf_overlay_next = 0
+                elif event.key == pygame.K_p:
+                    toggle_profile_capture()
+                elif event.key == pygame.K_m:
+                    toggle_memory_capture()
+                elif event.key == pygame.K_u and not is_solving and hint_grid is not None: # Takes back the last hint
+                    undo_hint()
+                elif event.key == pygame.K_l and not is_solving:
+                    try:
+                        dfs_solver = load_dfs_checkpoint(DFS_CHECKPOINT_FILE)
+                    except (OSError, ValueError, KeyError) as e:
+                        print(f"Could not load DFS checkpoint: {e}")
+                    else:
+                        drop_hints()
+                        puzzle_pending = False # The checkpoint's puzzle takes the place of the one being dug
+                        if dfs_solver.box != board_box: set_board_box(dfs_solver.box)
+                        original_puzzle = dfs_solver.puzzle
+                        current_grid_state = dfs_solver.grid
+                        solve_method = "DFS"
+                        is_solving = True
+                        is_solved = False
+                        timer_start_time = time.perf_counter()
+                        dfs_next_step_time = 0
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1: # Left click
+                    if current_game_state == MENU:
+                        if play_btn.collidepoint(event.pos):
+                            current_game_state = PLAYING
+                            audio.stop_music()
+                            show_new_puzzle()
+                        elif exit_btn.collidepoint(event.pos):
+                            game_running = False
+                    elif current_game_state == PLAYING:
+                        if popup_active_flag: # Click dismisses popup
                             popup_active_flag = False
-                            live_tree_nodes = [] # Clear tree
-                        elif gen_btn.collidepoint(event.pos):
-                            original_puzzle = generate_puzzle(holes=40)
-                            current_grid_state = [row[:] for row in original_puzzle]
-                            is_solving = is_solved = False
-                            popup_active_flag = False
-                            live_tree_nodes = [] # Clear tree
-
-    # --- Main Drawing Logic ---
-    if current_game_state == MENU:
-        draw_menu_screen(current_mouse_pos, current_mouse_clicks)
-        if not pygame.mixer.music.get_busy():
-            try: pygame.mixer.music.play(-1)
-            except pygame.error as e: print(f"Music error: {e}")
-    elif current_game_state == PLAYING:
-        if not is_solving: # If not actively in a blocking solve call (like DFS live)
-            # This redraws the static state (e.g., after BFS animation or before any solve)
-            redraw_entire_solving_screen(current_grid_state, None, live_tree_nodes, final_solution_node_ids, current_mouse_pos, current_mouse_clicks)
-        # If is_solving is true for DFS, drawing is handled inside solve_dfs_with_live_tree.
-        # If is_solving is true for BFS, drawing is handled inside animate_bfs_solution.
-
-        if popup_active_flag:
-            draw_popup_message(popup_message_text)
-            if time.time() > popup_disappear_time:
-                popup_active_flag = False
-    
-    if game_running : #only flip if not quit
-        pygame.display.flip()
-    clock.tick(60)
 
-pygame.quit()
\ No newline at end of file
+                        if is_solving and cancel_btn.collidepoint(event.pos):
+                            cancel_solve()
+                        elif not is_solving: # Process buttons only if not already solving
+                            if dfs_btn.collidepoint(event.pos) and not puzzle_pending: # Nothing to solve on the blank board
+                                solve_method = "DFS"
+                                is_solving = True # The main loop steps the DFS while this is set
+                                is_solved = False
+                                timer_start_time = time.perf_counter()
+
+                                # Initialize DFS live tree; the main loop steps the solver from here on
+                                drop_hints()
+                                dfs_solver = IterativeDFS(original_puzzle)
+                                current_grid_state = dfs_solver.grid
+                                start_live_tree(dfs_solver, 'DFS Root')
+                                dfs_next_step_time = 0
+
+                            elif bfs_btn.collidepoint(event.pos) and board_box <= BFS_MAX_BOX and not puzzle_pending:
+                                start_background_solve("BFS", bfs_job)
+                            elif auto_btn.collidepoint(event.pos) and not puzzle_pending:
+                                start_background_solve("Auto", auto_job)
+                            elif hint_btn.collidepoint(event.pos) and hint_grid is not None:
+                                give_hint()
+                            elif reset_btn.collidepoint(event.pos):
+                                current_grid_state = [row[:] for row in original_puzzle]
+                                reset_hints(original_puzzle)
+                                is_solving = is_solved = False
+                                popup_active_flag = False
+                                live_tree_nodes = [] # Clear tree
+                                bfs_view = None
+                            elif gen_btn.collidepoint(event.pos):
+                                show_new_puzzle()
+                            elif diff_btn.collidepoint(event.pos):
+                                difficulty = DIFFICULTY_ORDER[(DIFFICULTY_ORDER.index(difficulty) + 1) % len(DIFFICULTY_ORDER)]
+                                puzzle_pool.prefetch(difficulty) # Warm the band before New is pressed
+                            elif size_btn.collidepoint(event.pos):
+                                set_board_box(BOX_SIZES[(BOX_SIZES.index(board_box) + 1) % len(BOX_SIZES)])
+                                show_new_puzzle()
+
+        # --- Main Drawing Logic ---
+        if current_game_state == MENU:
+            draw_menu_screen(current_mouse_pos, current_mouse_clicks)
+            audio.keep_music_playing()
+        elif current_game_state == PLAYING:
+            frame_stats.start()
+            if puzzle_pending: poll_pending_puzzle()
+            # A cancelled DFS is finished even while paused
+            if is_solving and solve_method == "DFS" and (not dfs_solver.paused or dfs_solver.status != RUNNING) and \
+               pygame.time.get_ticks() >= dfs_next_step_time:
+                dfs_step_event = dfs_solver.step()
+                if dfs_step_event:
+                    apply_dfs_event(dfs_step_event)
+                    dfs_next_step_time = pygame.time.get_ticks() + NUM_DELAY
+                else: # Solved, exhausted or cancelled
+                    is_solving = False
+                    is_solved = dfs_solver.status == SOLVED
+                    dfs_highlight_cell = None
+                    if is_solved: mark_dfs_solution_path()
+                    finish_solve({SOLVED: 'Solved', CANCELLED: 'Cancelled'}.get(dfs_solver.status, 'No Solution'))
+            elif is_solving and solver_worker is not None: # BFS / Auto running on the worker thread
+                if revealing_solution: advance_reveal_animation()
+                else: handle_worker_events()
+            audio.flush() # At most one pop per frame, however many steps the solver took
+            frame_stats.stop('solve')
+
+            highlight = None
+            if is_solving: highlight = dfs_highlight_cell if solve_method == "DFS" else reveal_cell
+            elif hint_grid is not None: highlight = hint_cell
+            redraw_entire_solving_screen(current_grid_state, highlight, live_tree_nodes, final_solution_node_ids, current_mouse_pos, current_mouse_clicks)
+            if is_solving and solve_method != "DFS": # No live tree for BFS / Auto, show progress instead
+                msg_surf = font.render(tree_area_message, True, BLACK)
+                if bfs_view is not None: # Above the BFS view
+                    screen.blit(msg_surf, msg_surf.get_rect(midtop=(TREE_DISPLAY_RECT.centerx, TREE_DISPLAY_RECT.top + 8)))
+                else:
+                    screen.blit(msg_surf, msg_surf.get_rect(center=TREE_DISPLAY_RECT.center))
+            elif puzzle_pending:
+                msg_surf = font.render(f"Generating {difficulty} puzzle...", True, BLACK)
+                screen.blit(msg_surf, msg_surf.get_rect(center=TREE_DISPLAY_RECT.center))
+
+            if popup_active_flag:
+                draw_popup_message(popup_message_text)
+                if time.time() > popup_disappear_time:
+                    popup_active_flag = False
+            if perf_overlay_on: draw_perf_overlay()
+    
+        if game_running : #only flip if not quit
+            frame_stats.start()
+            pygame.display.flip()
+            frame_stats.stop('flip')
+        frame_stats.end_frame()
+        if not first_frame_shown:
+            first_frame_shown = True
+            if STARTUP_CHECK:
+                print(f"Startup: {(time.perf_counter() - STARTUP_START) * 1000:.1f} ms to the first frame")
+                game_running = False
+        clock.tick(60)
+
+    stop_tree_export()
+    stop_captures()
+    pygame.quit()
\ No newline at end of file
@@ -0,0 +1,202 @@
+import multiprocessing as mp
+import os
+import queue
+
+from sudoku_core import grid_to_string, string_to_grid
+
+# --- Work-splitting parallel DFS for one puzzle ---
+# The top of the search tree is expanded breadth-first (most constrained cell
+# first) into independent subproblems, which worker processes pull from a
+# shared task queue. A worker that notices idle peers gives away the untried
+# branches of its shallowest open frame, so one huge subtree cannot keep the
+# other cores waiting. Boards travel between processes as 81-char strings.
+
+ALL_DIGITS  = 0x3FE
+CHECK_EVERY = 1024 # Nodes between looks at the stop flag / idle workers
+SPLIT_FACTOR = 4   # Initial subproblems per worker
+WORKER_CHECK = 0.5 # Seconds without results before checking the workers are still alive
+
+
+def _board_masks(board): # Used-digit masks per row/col/box, or None on a clash
+    rows, cols, boxes = [0]*9, [0]*9, [0]*9
+    for cell, n in enumerate(board):
+        if n:
+            r, c = divmod(cell, 9)
+            b = (r//3)*3 + c//3
+            bit = 1 << n
+            if (rows[r] | cols[c] | boxes[b]) & bit: return None
+            rows[r] |= bit; cols[c] |= bit; boxes[b] |= bit
+    return rows, cols, boxes
+
+def _pick_cell(board, rows, cols, boxes): # (cell, candidate mask) with fewest candidates
+    best_cell, best_free, best_count = -1, 0, 10
+    for cell, n in enumerate(board):
+        if n: continue
+        r, c = divmod(cell, 9)
+        free = ~(rows[r] | cols[c] | boxes[(r//3)*3 + c//3]) & ALL_DIGITS
+        count = bin(free).count('1')
+        if count < best_count:
+            best_cell, best_free, best_count = cell, free, count
+            if count <= 1: break
+    return best_cell, best_free
+
+def _digits(mask):
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        yield bit.bit_length() - 1
+
+
+def split_subproblems(text, target): # Breadth-first expansion of the top levels
+    level = [text]
+    solved = []
+    while level and len(level) < target:
+        next_level = []
+        for board_text in level:
+            board = [int(ch) for ch in board_text]
+            masks = _board_masks(board)
+            if masks is None: continue
+            cell, free = _pick_cell(board, *masks)
+            if cell < 0:
+                solved.append(board_text)
+                continue
+            for n in _digits(free):
+                next_level.append(board_text[:cell] + str(n) + board_text[cell+1:])
+        if not next_level: return [], solved # Every board was solved or dead, nothing left to search
+        level = next_level
+    return level, solved
+
+
+def search_subproblem(text, count_all, stop, on_solution, wants_work=None, donate=None):
+    # Iterative DFS over one subproblem. Returns the number of solutions seen.
+    # wants_work() is polled every CHECK_EVERY nodes; when it says yes, the
+    # untried digits of the shallowest open frame are handed to donate() as
+    # new subproblems.
+    board = [int(ch) for ch in text]
+    masks = _board_masks(board)
+    if masks is None: return 0
+    rows, cols, boxes = masks
+    stack = [] # Frames: [cell, placed digit, untried candidate mask]
+    found = 0
+    nodes = 0
+    cell, free = _pick_cell(board, rows, cols, boxes)
+    if cell < 0:
+        on_solution(text)
+        return 1
+    stack.append([cell, 0, free])
+    while stack:
+        nodes += 1
+        if nodes % CHECK_EVERY == 0:
+            if stop.is_set(): break
+            if wants_work is not None and wants_work():
+                for frame in stack:
+                    if frame[2]:
+                        prefix = list(text)
+                        for cell_done, n_done, _ in stack:
+                            if cell_done == frame[0]: break
+                            prefix[cell_done] = str(n_done)
+                        donate([''.join(prefix[:frame[0]]) + str(n) + ''.join(prefix[frame[0]+1:])
+                                for n in _digits(frame[2])])
+                        frame[2] = 0
+                        break
+        frame = stack[-1]
+        cell = frame[0]
+        r, c = divmod(cell, 9)
+        b = (r//3)*3 + c//3
+        if frame[1]: # Undo the previous digit tried in this frame
+            bit = 1 << frame[1]
+            rows[r] ^= bit; cols[c] ^= bit; boxes[b] ^= bit
+            board[cell] = 0
+            frame[1] = 0
+        if not frame[2]:
+            stack.pop()
+            continue
+        bit = frame[2] & -frame[2]
+        frame[2] ^= bit
+        frame[1] = bit.bit_length() - 1
+        rows[r] |= bit; cols[c] |= bit; boxes[b] |= bit
+        board[cell] = frame[1]
+        next_cell, next_free = _pick_cell(board, rows, cols, boxes)
+        if next_cell < 0:
+            found += 1
+            on_solution(''.join(map(str, board)))
+            if not count_all: break
+        elif next_free:
+            stack.append([next_cell, 0, next_free])
+    return found
+
+
+def _worker(tasks, results, stop, idle, created, count_all):
+    while not stop.is_set():
+        with idle.get_lock(): idle.value += 1
+        try:
+            text = tasks.get(timeout=0.05)
+        except queue.Empty:
+            continue
+        finally:
+            with idle.get_lock(): idle.value -= 1
+
+        def wants_work():
+            return idle.value > 0 and tasks.empty()
+
+        def donate(texts):
+            with created.get_lock(): created.value += len(texts)
+            for t in texts: tasks.put(t)
+
+        def on_solution(solution_text):
+            if not count_all: results.put(('solution', solution_text))
+
+        found = search_subproblem(text, count_all, stop, on_solution, wants_work, donate)
+        results.put(('done', found))
+
+
+def _run(grid, count_all, workers, limit):
+    if len(grid) != 9 or any(len(row) != 9 for row in grid):
+        raise ValueError("The parallel DFS only takes 9x9 boards") # Masks and one-char digits below assume 81 cells
+    workers = workers or os.cpu_count() or 1
+    text = grid_to_string(grid)
+    subproblems, solved_early = split_subproblems(text, workers * SPLIT_FACTOR)
+    if solved_early and not count_all:
+        return string_to_grid(solved_early[0])
+    if not subproblems: return len(solved_early) if count_all else None
+
+    ctx = mp.get_context()
+    tasks, results = ctx.Queue(), ctx.Queue()
+    stop = ctx.Event()
+    idle = ctx.Value('i', 0)
+    created = ctx.Value('i', len(subproblems))
+    for sub in subproblems: tasks.put(sub)
+    procs = [ctx.Process(target=_worker, args=(tasks, results, stop, idle, created, count_all), daemon=True)
+             for _ in range(min(workers, max(1, len(subproblems))))]
+    for p in procs: p.start()
+
+    total = len(solved_early)
+    finished = 0
+    answer = None
+    try:
+        while finished < created.value:
+            try:
+                kind, payload = results.get(timeout=WORKER_CHECK)
+            except queue.Empty: # Workers only exit once stopped, so a dead one took its subproblem with it
+                dead = [p.exitcode for p in procs if not p.is_alive()]
+                if dead: raise RuntimeError(f"{len(dead)} parallel DFS worker(s) died, exit codes {dead}")
+                continue
+            if kind == 'solution':
+                answer = string_to_grid(payload)
+                break # First solution wins, everyone else gets cancelled
+            finished += 1
+            total += payload
+            if limit is not None and total >= limit: break
+    finally:
+        stop.set()
+        for p in procs:
+            p.join(timeout=1)
+            if p.is_alive(): p.terminate()
+    return total if count_all else answer
+
+def solve_parallel(grid, workers=None): # Solved copy of grid or None
+    return _run(grid, False, workers, None)
+
+def count_solutions_parallel(grid, workers=None, limit=None): # Total solutions, stops early at limit
+    return _run(grid, True, workers, limit)
+# --- End Work-splitting parallel DFS ---
@@ -0,0 +1,166 @@
+import json
+import multiprocessing as mp
+import os
+import queue
+import random
+import signal
+import time
+
+from sudoku_core import backtrack_fill, box_size, solve_bfs, solve_mrv
+from exact_cover import solve_exact_cover
+
+# --- Portfolio solver ---
+# No single engine wins on every puzzle, so the portfolio races several of
+# them on the same puzzle in separate processes, keeps the first answer and
+# kills the rest. Every race is logged to STATS_FILE, and once a clue-count
+# bucket has enough races behind it the usual winner is picked directly.
+
+STATS_FILE   = 'portfolio_stats.jsonl'
+CLUE_BUCKET  = 5    # Puzzles with clue counts in the same band of 5 share stats
+MIN_RACES    = 5    # Races needed in a bucket before trusting its stats
+MIN_WIN_SHARE = 0.6 # The favourite must have won at least this share of them
+EXPLORE_RATE = 0.1  # Chance of racing anyway, so stale stats get refreshed
+KILL_GRACE   = 0.2  # Seconds a losing engine gets to exit on SIGTERM before it is killed
+
+try:
+    from vector_bfs import solve_bfs_vectorized
+    from batch_solver import solve_batch, SOLVED
+except ImportError: # NumPy missing, the BFS engine uses the plain queue and propagation sits out
+    solve_bfs_vectorized = solve_batch = None
+
+
+def _engine_dfs(grid):
+    result = [row[:] for row in grid]
+    return result if backtrack_fill(result) else None
+
+def _engine_bfs(grid):
+    if solve_bfs_vectorized: return solve_bfs_vectorized(grid)
+    return solve_bfs([row[:] for row in grid])
+
+def _engine_propagation(grid):
+    boards, status = solve_batch([grid])
+    return boards[0].reshape(9, 9).tolist() if status[0] == SOLVED else None
+
+ENGINES = {
+    'dfs': _engine_dfs,
+    'bfs': _engine_bfs,
+    'mrv': solve_mrv,
+    'exact_cover': solve_exact_cover,
+}
+if solve_batch:
+    ENGINES['propagation'] = _engine_propagation
+CLASSIC_ONLY = {'propagation'} # Engines that only take 9x9 boards
+BFS_MAX_BOX = 4 # 25x25 frontiers pass 700k boards and run out of memory
+
+def engines_for(grid):
+    box = box_size(grid)
+    return [name for name in ENGINES
+            if (box == 3 or name not in CLASSIC_ONLY) and (box <= BFS_MAX_BOX or name != 'bfs')]
+
+
+def count_clues(grid):
+    return sum(1 for row in grid for n in row if n)
+
+
+def _run_engine(name, grid, results):
+    # Forked from the app, the engine inherits SDL's SIGTERM handler, which
+    # would swallow terminate(); losers must die when the race is over
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    start = time.perf_counter()
+    try:
+        solution = ENGINES[name](grid)
+    except Exception as e: # An engine blowing up just drops out of the race
+        results.put((name, False, repr(e), 0.0))
+        return
+    results.put((name, True, solution, time.perf_counter() - start))
+
+def race(grid, engines=None, timeout=None, should_stop=None):
+    # Returns (solution, winning engine, seconds). The winner's answer may be
+    # None, meaning it proved there is no solution. (None, None, t) if every
+    # engine failed, the timeout ran out or should_stop() asked to give up.
+    names = list(engines or engines_for(grid))
+    results = mp.Queue()
+    procs = [mp.Process(target=_run_engine, args=(name, grid, results), daemon=True) for name in names]
+    start = time.perf_counter()
+    for p in procs: p.start()
+    answer = (None, None)
+    try:
+        pending = len(procs)
+        while pending:
+            if should_stop is not None and should_stop(): break
+            if timeout is not None and time.perf_counter() - start > timeout: break
+            try:
+                name, ok, payload, _ = results.get(timeout=0.05)
+            except queue.Empty:
+                if not any(p.is_alive() for p in procs) and results.empty(): break # Every engine died without a word
+                continue
+            pending -= 1
+            if ok:
+                answer = (payload, name)
+                break
+            print(f"Portfolio engine {name} failed: {payload}")
+    finally:
+        for p in procs:
+            if p.is_alive(): p.terminate()
+        deadline = time.perf_counter() + KILL_GRACE
+        for p in procs: # The winner's answer never waits on a loser
+            p.join(max(0.0, deadline - time.perf_counter()))
+            if p.is_alive():
+                p.kill()
+                p.join()
+    return answer[0], answer[1], time.perf_counter() - start
+
+
+# --- Race statistics ---
+_stats_cache = {} # path -> ((mtime, size), {(board size, bucket): {engine: wins}})
+
+def log_race(clues, engine, seconds, stats_file=STATS_FILE, size=9):
+    with open(stats_file, 'a') as f:
+        f.write(json.dumps({'size': size, 'clues': clues, 'engine': engine, 'seconds': round(seconds, 6)}) + '\n')
+
+def load_win_counts(stats_file=STATS_FILE):
+    try:
+        st = os.stat(stats_file)
+    except OSError:
+        return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _stats_cache.get(stats_file)
+    if cached and cached[0] == stamp: return cached[1]
+    wins = {}
+    with open(stats_file) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue # Skip a half-written line
+            bucket_key = (entry.get('size', 9), entry['clues'] // CLUE_BUCKET) # Lines from before sizes were 9x9
+            bucket = wins.setdefault(bucket_key, {})
+            bucket[entry['engine']] = bucket.get(entry['engine'], 0) + 1
+    _stats_cache[stats_file] = (stamp, wins)
+    return wins
+
+def choose_engine(grid, stats_file=STATS_FILE): # Favourite engine for this clue count, or None
+    bucket = load_win_counts(stats_file).get((len(grid), count_clues(grid) // CLUE_BUCKET), {})
+    bucket = {name: wins for name, wins in bucket.items() if name in engines_for(grid)}
+    total = sum(bucket.values())
+    if total < MIN_RACES: return None
+    best = max(bucket, key=bucket.get)
+    return best if bucket[best] >= MIN_WIN_SHARE * total else None
+# --- End Race statistics ---
+
+
+def solve_auto(grid, stats_file=STATS_FILE, timeout=None, should_stop=None):
+    # Returns (solution, engine, seconds, raced). Runs just the favourite
+    # engine when the stats are clear enough, otherwise races and logs. The
+    # favourite still gets its own process, so timeout and should_stop()
+    # can kill it like any racer.
+    engine = choose_engine(grid, stats_file)
+    if engine and random.random() >= EXPLORE_RATE:
+        solution, engine, seconds = race(grid, [engine], timeout, should_stop)
+        return solution, engine, seconds, False
+    solution, engine, seconds = race(grid, timeout=timeout, should_stop=should_stop)
+    if engine:
+        log_race(count_clues(grid), engine, seconds, stats_file, len(grid))
+        print(f"Portfolio: {engine} won in {seconds:.3f}s")
+    return solution, engine, seconds, True
+# --- End Portfolio solver ---
@@ -0,0 +1,107 @@
+import cProfile
+import io
+import pstats
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+# --- Frame timing ---
+# FrameStats keeps the last WINDOW frames' timings, split by phase, so the
+# overlay can show where a frame goes without logging anything per frame.
+# The main loop brackets each phase with start()/stop(); a phase hit more
+# than once in a frame adds up.
+
+WINDOW = 120 # Frames averaged, two seconds at 60 FPS
+
+class FrameStats:
+    def __init__(self, phases, window=WINDOW):
+        self.phases = list(phases)
+        self.frames = deque(maxlen=window) # (frame seconds, {phase: seconds})
+        self._current = dict.fromkeys(self.phases, 0.0)
+        self._frame_start = self._phase_start = time.perf_counter()
+
+    def start(self):
+        self._phase_start = time.perf_counter()
+
+    def stop(self, phase):
+        self._current[phase] += time.perf_counter() - self._phase_start
+
+    def end_frame(self): # Call before clock.tick, so the idle wait is not counted
+        now = time.perf_counter()
+        self.frames.append((now - self._frame_start, self._current))
+        self._current = dict.fromkeys(self.phases, 0.0)
+
+    def begin_frame(self):
+        self._frame_start = time.perf_counter()
+
+    def averages(self): # (mean frame ms, worst frame ms, {phase: mean ms})
+        if not self.frames: return 0.0, 0.0, dict.fromkeys(self.phases, 0.0)
+        count = len(self.frames)
+        per_phase = {name: 1000 * sum(split[name] for _, split in self.frames) / count for name in self.phases}
+        total = sum(seconds for seconds, _ in self.frames)
+        return 1000 * total / count, 1000 * max(seconds for seconds, _ in self.frames), per_phase
+# --- End Frame timing ---
+
+
+# --- Profiling captures ---
+# A capture runs cProfile on the main thread and on any worker thread whose
+# job goes through wrap(), and merges them all when it is dumped. Memory
+# captures compare a tracemalloc snapshot from start() with one from dump().
+# Both write plain text reports next to the app (plus a .prof file pstats or
+# snakeviz can load), named with the time the capture started.
+# From Python 3.12 cProfile runs on sys.monitoring, which sees every thread
+# but allows only one active profiler, so wrap() leaves jobs alone there.
+
+TOP_ENTRIES = 40 # Lines in the text reports
+PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+class ProfileCapture:
+    def __init__(self):
+        self.started = time.strftime('%Y%m%d-%H%M%S')
+        self._main = cProfile.Profile()
+        self._threads = [] # Profiles of wrapped worker jobs
+        self._main.enable()
+
+    def wrap(self, job): # Same job, profiled on whichever thread runs it
+        if PROFILES_ALL_THREADS: return job # The main profiler already covers it
+        def profiled(*args):
+            profile = cProfile.Profile()
+            self._threads.append(profile)
+            return profile.runcall(job, *args)
+        return profiled
+
+    def dump(self, prefix='profile'): # Stops the capture; returns the report path
+        self._main.disable()
+        stats = pstats.Stats(self._main)
+        for profile in self._threads: # A job still running adds what it has so far
+            profile.snapshot_stats()
+            if profile.stats: stats.add(profile) # One that never got to run has nothing to add
+        path = f'{prefix}-{self.started}'
+        stats.dump_stats(path + '.prof')
+        text = io.StringIO()
+        stats.stream = text
+        stats.sort_stats('cumulative').print_stats(TOP_ENTRIES)
+        stats.sort_stats('tottime').print_stats(TOP_ENTRIES)
+        with open(path + '.txt', 'w') as f: f.write(text.getvalue())
+        return path + '.txt'
+
+
+class MemoryCapture:
+    def __init__(self):
+        self.started = time.strftime('%Y%m%d-%H%M%S')
+        tracemalloc.start()
+        self._before = tracemalloc.take_snapshot()
+
+    def dump(self, prefix='memory'): # Stops the capture; returns the report path
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        path = f'{prefix}-{self.started}.txt'
+        with open(path, 'w') as f:
+            f.write(f"Traced now {current / 2**20:.1f} MB, peak {peak / 2**20:.1f} MB\n\n")
+            f.write(f"Top {TOP_ENTRIES} allocation sites by growth since the capture started:\n")
+            for stat in after.compare_to(self._before, 'lineno')[:TOP_ENTRIES]:
+                f.write(f"{stat}\n")
+        return path
+# --- End Profiling captures ---
@@ -0,0 +1,344 @@
+import random
+import threading
+from collections import deque
+
+from sudoku_core import generate_solved_grid, transform_grid
+
+# --- Difficulty rating ---
+# A puzzle is rated by replaying it with a propagating solver that only uses
+# human techniques (naked/hidden singles, locked candidates) and falls back
+# to branching on the most constrained cell when they run dry. Each technique
+# use adds its weight to the score, so the score tracks how hard the puzzle
+# is to solve by hand rather than how many holes it has.
+# Boards here are flat lists of 81 ints; candidates are 9-bit masks (bit d-1 = digit d).
+
+ALL_CANDIDATES = 0x1FF
+
+TECHNIQUE_WEIGHTS = {
+    'naked_single': 1,
+    'hidden_single': 4,
+    'locked_candidates': 20,
+    'branch': 80,
+}
+
+# Score bands for the difficulty selector, lower bound inclusive. Every hole
+# costs at least one naked single, so a score is never below the hole count.
+DIFFICULTY_BANDS = {
+    'Easy':   (40, 80),
+    'Medium': (80, 150),
+    'Hard':   (150, 250),
+    'Expert': (250, 10**9),
+}
+DIFFICULTY_ORDER = ['Easy', 'Medium', 'Hard', 'Expert']
+
+_ROWS = [[r*9 + c for c in range(9)] for r in range(9)]
+_COLS = [[r*9 + c for r in range(9)] for c in range(9)]
+_BOXES = [[r*9 + c for r in range(br, br+3) for c in range(bc, bc+3)] for br in (0, 3, 6) for bc in (0, 3, 6)]
+_UNITS = _ROWS + _COLS + _BOXES
+_PEERS = [tuple(sorted(set(_ROWS[i // 9] + _COLS[i % 9] + _BOXES[(i//27)*3 + (i % 9)//3]) - {i})) for i in range(81)]
+_POPCOUNT = [bin(m).count('1') for m in range(512)]
+
+
+_ROW_OF = [i // 9 for i in range(81)]
+_COL_OF = [i % 9 for i in range(81)]
+_BOX_OF = [(i//27)*3 + (i % 9)//3 for i in range(81)]
+
+def _unit_masks(cells): # Placed digits per row/col/box, or None if the givens clash
+    rows, cols, boxes = [0]*9, [0]*9, [0]*9
+    for idx, n in enumerate(cells):
+        if n:
+            bit = 1 << (n - 1)
+            r, c, b = _ROW_OF[idx], _COL_OF[idx], _BOX_OF[idx]
+            if (rows[r] | cols[c] | boxes[b]) & bit: return None
+            rows[r] |= bit; cols[c] |= bit; boxes[b] |= bit
+    return rows, cols, boxes
+
+def _initial_candidates(cells): # None if the givens already clash
+    masks = _unit_masks(cells)
+    if masks is None: return None
+    rows, cols, boxes = masks
+    return [0 if n else ~(rows[_ROW_OF[i]] | cols[_COL_OF[i]] | boxes[_BOX_OF[i]]) & ALL_CANDIDATES
+            for i, n in enumerate(cells)]
+
+def _place(cells, cand, idx, n):
+    cells[idx] = n
+    cand[idx] = 0
+    keep = ~(1 << (n - 1))
+    for p in _PEERS[idx]:
+        cand[p] &= keep
+
+
+def _sweep_naked_singles(cells, cand): # Places every naked single; count, or -1 on contradiction
+    placed = 0
+    progress = True
+    while progress:
+        progress = False
+        for idx in range(81):
+            if cells[idx]: continue
+            mask = cand[idx]
+            if not mask: return -1
+            if _POPCOUNT[mask] == 1:
+                _place(cells, cand, idx, mask.bit_length())
+                placed += 1
+                progress = True
+    return placed
+
+def _place_hidden_singles(cells, cand): # One pass over all units; count placed, -1 on contradiction
+    placed_count = 0
+    for unit in _UNITS:
+        once = twice = placed = 0
+        for idx in unit:
+            n = cells[idx]
+            if n:
+                placed |= 1 << (n - 1)
+                continue
+            twice |= once & cand[idx]
+            once |= cand[idx]
+        if (once | placed) != ALL_CANDIDATES: return -1 # Some digit has nowhere to go
+        single = once & ~twice
+        if not single: continue
+        for idx in unit:
+            bit = cand[idx] & single
+            if bit:
+                if bit & (bit - 1): return -1 # Two digits forced into one cell
+                _place(cells, cand, idx, bit.bit_length())
+                placed_count += 1
+    return placed_count
+
+# (intersection, rest of box, rest of line) for every box/line pair that meet
+_INTERSECTIONS = []
+for _box in _BOXES:
+    for _line in _ROWS + _COLS:
+        _inter = [i for i in _box if i in _line]
+        if _inter:
+            _INTERSECTIONS.append((_inter, [i for i in _box if i not in _inter], [i for i in _line if i not in _inter]))
+
+def _apply_locked_candidates(cand):
+    # Pointing: a digit confined to one row/col inside a box leaves the rest of that line.
+    # Claiming: a digit confined to one box inside a row/col leaves the rest of that box.
+    changed = False
+    for inter, box_rest_cells, line_rest_cells in _INTERSECTIONS:
+        in_inter = cand[inter[0]] | cand[inter[1]] | cand[inter[2]]
+        if not in_inter: continue
+        box_rest = line_rest = 0
+        for idx in box_rest_cells: box_rest |= cand[idx]
+        for idx in line_rest_cells: line_rest |= cand[idx]
+        pointing = in_inter & ~box_rest & line_rest
+        claiming = in_inter & ~line_rest & box_rest
+        if pointing:
+            for idx in line_rest_cells: cand[idx] &= ~pointing
+            changed = True
+        if claiming:
+            for idx in box_rest_cells: cand[idx] &= ~claiming
+            changed = True
+    return changed
+
+def _logic(cells, cand, counts, use_locked):
+    # Runs the techniques to a fixed point, cheapest first. False on contradiction.
+    while True:
+        placed = _sweep_naked_singles(cells, cand)
+        if placed < 0: return False
+        counts['naked_single'] += placed
+        placed = _place_hidden_singles(cells, cand)
+        if placed < 0: return False
+        if placed:
+            counts['hidden_single'] += placed
+            continue
+        if use_locked and _apply_locked_candidates(cand):
+            counts['locked_candidates'] += 1
+            continue
+        return True
+
+def _search(cells, cand, counts, limit, use_locked, solutions):
+    # Logic first, then branch on the most constrained cell. Appends solutions up to limit.
+    if not _logic(cells, cand, counts, use_locked): return
+    best_idx, best_count = -1, 10
+    for idx in range(81):
+        if not cells[idx] and _POPCOUNT[cand[idx]] < best_count:
+            best_idx, best_count = idx, _POPCOUNT[cand[idx]]
+            if best_count == 2: break
+    if best_idx < 0:
+        solutions.append(cells[:])
+        return
+    counts['branch'] += 1
+    mask = cand[best_idx]
+    while mask and len(solutions) < limit:
+        bit = mask & -mask
+        mask ^= bit
+        child_cells, child_cand = cells[:], cand[:]
+        _place(child_cells, child_cand, best_idx, bit.bit_length())
+        _search(child_cells, child_cand, counts, limit, use_locked, solutions)
+
+
+def count_solutions(grid, limit=2): # Solutions of grid (list of rows), counting stops at limit
+    cells = [n for row in grid for n in row]
+    cand = _initial_candidates(cells)
+    if cand is None: return 0
+    solutions = []
+    _search(cells, cand, dict.fromkeys(TECHNIQUE_WEIGHTS, 0), limit, False, solutions)
+    return len(solutions)
+
+def band_for_score(score):
+    for name in DIFFICULTY_ORDER:
+        lo, hi = DIFFICULTY_BANDS[name]
+        if lo <= score < hi: return name
+    return DIFFICULTY_ORDER[-1]
+
+def rate_puzzle(grid):
+    # {'score', 'band', 'techniques': {name: uses}, 'solutions': 0, 1 or 2 (2 = several)}
+    cells = [n for row in grid for n in row]
+    counts = dict.fromkeys(TECHNIQUE_WEIGHTS, 0)
+    cand = _initial_candidates(cells)
+    solutions = []
+    if cand is not None:
+        _search(cells, cand, counts, 2, True, solutions)
+    score = sum(TECHNIQUE_WEIGHTS[name] * uses for name, uses in counts.items())
+    return {'score': score, 'band': band_for_score(score), 'techniques': counts, 'solutions': len(solutions)}
+# --- End Difficulty rating ---
+
+
+# --- Difficulty-targeted generation ---
+def _still_unique(cells, idx, digit, rows, cols, boxes):
+    # cells is a unique puzzle whose cell idx (solution digit) was just
+    # emptied, with the unit masks already updated. Unique again exactly when
+    # no solution puts another digit in idx.
+    r, c, b = _ROW_OF[idx], _COL_OF[idx], _BOX_OF[idx]
+    others = ~(rows[r] | cols[c] | boxes[b]) & ALL_CANDIDATES & ~(1 << (digit - 1))
+    if not others: return True # Naked single
+    for unit in (_ROWS[r], _COLS[c], _BOXES[b]): # Hidden single: digit fits nowhere else in a unit
+        bit = 1 << (digit - 1)
+        if not any(not cells[i] and i != idx and
+                   not (rows[_ROW_OF[i]] | cols[_COL_OF[i]] | boxes[_BOX_OF[i]]) & bit for i in unit):
+            return True
+    # Otherwise search for a solution with the old digit ruled out of idx
+    cand = [0 if n else ~(rows[_ROW_OF[i]] | cols[_COL_OF[i]] | boxes[_BOX_OF[i]]) & ALL_CANDIDATES
+            for i, n in enumerate(cells)]
+    cand[idx] = others
+    solutions = []
+    _search(cells[:], cand, dict.fromkeys(TECHNIQUE_WEIGHTS, 0), 1, False, solutions)
+    return not solutions
+
+DIG_STEP = 4 # Holes dug between ratings once the band is within reach
+
+def _dig(cells, masks, order, holes):
+    # Empties cells from order (consumed in place) while the solution stays unique
+    rows, cols, boxes = masks
+    while order and holes > 0:
+        idx = order.pop()
+        digit = cells[idx]
+        bit = 1 << (digit - 1)
+        r, c, b = _ROW_OF[idx], _COL_OF[idx], _BOX_OF[idx]
+        cells[idx] = 0
+        rows[r] ^= bit; cols[c] ^= bit; boxes[b] ^= bit
+        if _still_unique(cells, idx, digit, rows, cols, boxes):
+            holes -= 1
+        else:
+            cells[idx] = digit
+            rows[r] ^= bit; cols[c] ^= bit; boxes[b] ^= bit
+
+def dig_rated_puzzle(band='Medium', max_attempts=20):
+    # Digs holes in a fresh grid, keeping the solution unique, until the
+    # rating lands in the band. Returns (grid, rating); the closest attempt
+    # if no attempt hits the band.
+    lo, hi = DIFFICULTY_BANDS[band]
+    best = None
+    for _ in range(max_attempts):
+        cells = [n for row in generate_solved_grid() for n in row]
+        masks = _unit_masks(cells)
+        order = random.sample(range(81), 81)
+        _dig(cells, masks, order, lo) # Score >= holes, so nothing can be rated in band before this
+        while True:
+            grid = [cells[i:i+9] for i in range(0, 81, 9)]
+            rating = rate_puzzle(grid)
+            if rating['score'] >= lo or not order: break
+            holes_before = cells.count(0)
+            _dig(cells, masks, order, min(DIG_STEP, hi - 1 - holes_before))
+            if cells.count(0) == holes_before: break # Minimal puzzle, nothing more to dig
+        if lo <= rating['score'] < hi: return grid, rating
+        distance = lo - rating['score'] if rating['score'] < lo else rating['score'] - hi + 1
+        if best is None or distance < best[0]: best = (distance, grid, rating)
+    return best[1], best[2]
+
+# Digging is the slow part, so each band keeps a few dug puzzles as bases.
+# Most requests are served by a symmetry transform of a base: relabelling and
+# row/column/band shuffles keep the solution unique and need exactly the same
+# techniques, so a quick re-rate is all the checking left to do.
+BASE_PUZZLES_PER_BAND = 8
+FRESH_DIG_RATE = 0.02 # Share of requests that dig a new base anyway, for variety
+_base_puzzles = {band: [] for band in DIFFICULTY_ORDER}
+
+def transformed_base_puzzle(band): # (grid, rating) from a stored base, or None; never digs
+    bases = _base_puzzles.get(band)
+    if not bases: return None
+    for _ in range(4):
+        grid = transform_grid(random.choice(bases))
+        rating = rate_puzzle(grid)
+        if rating['band'] == band: return grid, rating
+    return None
+
+def generate_rated_puzzle(band='Medium'): # (grid, rating) with rating['band'] == band when at all possible
+    bases = _base_puzzles[band]
+    if len(bases) >= BASE_PUZZLES_PER_BAND and random.random() >= FRESH_DIG_RATE:
+        puzzle = transformed_base_puzzle(band)
+        if puzzle: return puzzle
+    grid, rating = dig_rated_puzzle(band)
+    if rating['band'] == band:
+        if len(bases) < BASE_PUZZLES_PER_BAND: bases.append(grid)
+        else: bases[random.randrange(len(bases))] = grid
+    return grid, rating
+# --- End Difficulty-targeted generation ---
+
+
+# --- Background puzzle pool ---
+# Keeps a few rated puzzles ready on a daemon thread for every band that has
+# been asked for, so the New button never waits on the generator. Given a
+# rated Corpus (see corpus.py), bands it holds are drawn from the file
+# instead of dug, and only re-rated for the technique counts.
+POOL_SIZE = 4
+
+class PuzzlePool:
+    def __init__(self, bands=DIFFICULTY_ORDER, size=POOL_SIZE, corpus=None):
+        self.size = size
+        self.corpus = corpus
+        self._ready = {band: deque() for band in bands}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _fill(self):
+        while True:
+            with self._lock:
+                short = [band for band, ready in self._ready.items() if len(ready) < self.size]
+            if not short:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            band = min(short, key=lambda b: len(self._ready[b]))
+            puzzle = self._make(band)
+            with self._lock:
+                self._ready[band].append(puzzle)
+
+    def _make(self, band):
+        if self.corpus is not None and self.corpus.band_size(band):
+            grid = transform_grid(self.corpus.sample(band))
+            return grid, rate_puzzle(grid)
+        return generate_rated_puzzle(band)
+
+    def prefetch(self, band): # Starts keeping band topped up
+        with self._lock:
+            self._ready.setdefault(band, deque())
+        self._wake.set()
+
+    def get(self, band): # (grid, rating), or None while the band's first puzzle is still being dug
+        # Called from the UI thread, so an empty band never digs here: the
+        # corpus or a transform of an already dug base covers it if it can,
+        # otherwise the fill thread is left to produce one
+        with self._lock:
+            ready = self._ready.setdefault(band, deque())
+            puzzle = ready.popleft() if ready else None
+        self._wake.set()
+        if puzzle: return puzzle
+        if self.corpus is not None and self.corpus.band_size(band): return self._make(band)
+        return transformed_base_puzzle(band)
+# --- End Background puzzle pool ---
@@ -0,0 +1,343 @@
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.connection import wait
+
+from sudoku_core import solve_mrv, generate_puzzle, grid_to_string, string_to_grid, BOX_SIZES, DEFAULT_HOLES
+from rating import count_solutions, rate_puzzle, generate_rated_puzzle, DIFFICULTY_ORDER
+
+# --- Local solve service ---
+# Serves the headless solvers over HTTP/JSON on localhost, so other tools can
+# use them without a pygame window. Requests go into a bounded queue. A
+# dispatcher thread takes whatever has queued up while the workers were busy,
+# plus anything arriving within BATCH_WAIT, up to BATCH_SIZE requests, and hands the batch to an idle worker from a pool of
+# processes forked at start-up. Inside a batch, all 9x9 solves are done in one
+# lockstep NumPy propagation pass. A worker that runs past the deadlines of
+# its whole batch is killed and replaced, so one pathological puzzle cannot
+# hold a worker forever.
+#
+#   POST /solve    {"puzzle": "..."}                  -> {"solution": "..." or null}
+#   POST /solve    {"puzzles": ["...", ...]}          -> {"solutions": [...]}
+#   POST /count    {"puzzle": "...", "limit": 2}      -> {"count": n}  (9x9)
+#   POST /generate {"band": "Medium"} or {"size": 16} -> {"puzzle": "...", "rating": {...}}
+#   POST /rate     {"puzzle": "..."}                  -> rate_puzzle's dict  (9x9)
+#   GET  /health                                      -> {"workers": n, "queued": n}
+# Every POST body may carry "timeout" in seconds, capped at MAX_TIMEOUT.
+# A full queue answers 503 and a missed deadline 504.
+
+HOST = '127.0.0.1' # Loopback only, the service has no authentication
+PORT = 8765
+BATCH_SIZE = 64      # Most requests handed to a worker at once
+BATCH_WAIT = 0.0     # Seconds to wait for stragglers once the queue is drained; load batches by itself
+QUEUE_LIMIT = 4096   # Requests waiting for a worker before new ones get 503
+DEFAULT_TIMEOUT = 10.0
+MAX_TIMEOUT = 60.0
+KILL_GRACE = 0.5     # Extra seconds a worker gets past its batch's last deadline
+MAX_COUNT_LIMIT = 10000
+MAX_PUZZLES = 1000   # Puzzles in one /solve request
+MAX_BODY = 1 << 20
+
+try:
+    from batch_solver import solve_batch, SOLVED
+except ImportError: # NumPy missing, every solve goes through solve_mrv
+    solve_batch = None
+
+
+class ServiceError(Exception): # Carries the HTTP status the handler answers with
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Worker side ---
+def _solve_many(puzzles): # Solution strings (or None) for a list of puzzle strings
+    results = [None] * len(puzzles)
+    classic = [i for i, text in enumerate(puzzles) if len(text) == 81]
+    if solve_batch and len(classic) > 1:
+        boards, status = solve_batch([string_to_grid(puzzles[i]) for i in classic])
+        for i, board, code in zip(classic, boards, status):
+            if code == SOLVED: results[i] = grid_to_string(board.reshape(9, 9).tolist())
+        classic = set(classic)
+    else:
+        classic = set()
+    for i, text in enumerate(puzzles):
+        if i in classic: continue
+        solution = solve_mrv(string_to_grid(text))
+        results[i] = grid_to_string(solution) if solution else None
+    return results
+
+def _run_one(op, params):
+    if op == 'count':
+        return {'count': count_solutions(string_to_grid(params['puzzle']), params['limit'])}
+    if op == 'rate':
+        return rate_puzzle(string_to_grid(params['puzzle']))
+    if op == 'generate':
+        if params['size'] == 9:
+            grid, rating = generate_rated_puzzle(params['band'])
+            return {'puzzle': grid_to_string(grid), 'rating': rating}
+        box = BOX_SIZES[[b * b for b in BOX_SIZES].index(params['size'])]
+        return {'puzzle': grid_to_string(generate_puzzle(DEFAULT_HOLES[box], box=box)), 'rating': None}
+    raise ValueError(f"Unknown operation {op!r}")
+
+def run_batch(batch): # batch: [(request id, op, params, deadline)] -> [(request id, ok, payload)]
+    out = []
+    live = []
+    for item in batch:
+        if item[3] < time.time(): out.append((item[0], False, 'timeout')) # Expired while queued
+        else: live.append(item)
+    solves = [item for item in live if item[1] == 'solve']
+    if solves: # Puzzles of every solve request in the batch go through _solve_many together
+        solutions = iter(_solve_many([text for _, _, params, _ in solves for text in params['puzzles']]))
+        for req_id, _, params, _ in solves:
+            found = [next(solutions) for _ in params['puzzles']]
+            out.append((req_id, True, {'solutions': found} if params['many'] else {'solution': found[0]}))
+    for req_id, op, params, deadline in live:
+        if op == 'solve': continue
+        if deadline < time.time():
+            out.append((req_id, False, 'timeout'))
+            continue
+        try:
+            out.append((req_id, True, _run_one(op, params)))
+        except Exception as e: # Reported to the caller, the worker carries on
+            out.append((req_id, False, repr(e)))
+    return out
+
+def _worker(conn):
+    while True:
+        try:
+            batch = conn.recv()
+        except EOFError: # Pool shut down
+            return
+        conn.send(run_batch(batch))
+
+
+# --- Server side ---
+class _Request:
+    __slots__ = ('id', 'op', 'params', 'deadline', 'done', 'ok', 'payload')
+
+    def __init__(self, req_id, op, params, deadline):
+        self.id, self.op, self.params, self.deadline = req_id, op, params, deadline
+        self.done = threading.Event()
+        self.ok = self.payload = None
+
+    def finish(self, ok, payload):
+        self.ok, self.payload = ok, payload
+        self.done.set()
+
+
+class WorkerPool:
+    def __init__(self, workers=None, batch_size=BATCH_SIZE, batch_wait=BATCH_WAIT, queue_limit=QUEUE_LIMIT):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.pending = queue.Queue(maxsize=queue_limit)
+        self._ids = iter(range(1, 1 << 62))
+        self._lock = threading.Lock()
+        self._idle = queue.Queue() # Worker slots ready for a batch
+        self._slots = [] # Per worker: [process, connection, {request id: request}, kill time]
+        for _ in range(workers or os.cpu_count() or 1):
+            self._slots.append(self._spawn())
+            self._idle.put(len(self._slots) - 1)
+        self._closed = False
+        self._threads = [threading.Thread(target=self._dispatch, daemon=True),
+                         threading.Thread(target=self._collect, daemon=True)]
+        for t in self._threads: t.start()
+
+    def _spawn(self):
+        parent, child = mp.Pipe()
+        proc = mp.Process(target=_worker, args=(child,), daemon=True)
+        proc.start()
+        child.close()
+        return [proc, parent, {}, None]
+
+    def submit(self, op, params, timeout=DEFAULT_TIMEOUT):
+        # Blocks until the request is answered; raises ServiceError on a full queue or missed deadline
+        with self._lock:
+            req = _Request(next(self._ids), op, params, time.time() + timeout)
+        try:
+            self.pending.put_nowait(req)
+        except queue.Full:
+            raise ServiceError(503, "Queue full, try again later") from None
+        if not req.done.wait(timeout + KILL_GRACE) or req.payload == 'timeout':
+            raise ServiceError(504, f"No answer within {timeout:g}s")
+        if not req.ok: raise ServiceError(500, req.payload)
+        return req.payload
+
+    def _dispatch(self):
+        while not self._closed:
+            slot = self._idle.get()
+            if slot is None: return
+            batch = [self.pending.get()]
+            if batch[0] is None: return
+            fill_until = time.perf_counter() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    req = self.pending.get(timeout=max(0.0, fill_until - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if req is None: return
+                batch.append(req)
+            with self._lock:
+                entry = self._slots[slot]
+                entry[2] = {req.id: req for req in batch}
+                entry[3] = max(req.deadline for req in batch) + KILL_GRACE
+                entry[1].send([(req.id, req.op, req.params, req.deadline) for req in batch])
+
+    def _collect(self):
+        while not self._closed:
+            with self._lock: # Idle pipes stay quiet, so every worker is watched
+                conns = {entry[1]: slot for slot, entry in enumerate(self._slots)}
+            for conn in wait(list(conns), timeout=0.05): # Timeout bounds how late _reap runs
+                slot = conns[conn]
+                try:
+                    results = conn.recv()
+                except (EOFError, OSError): # Worker died; _reap replaces it
+                    continue
+                with self._lock:
+                    entry = self._slots[slot]
+                    requests, entry[2], entry[3] = entry[2], {}, None
+                for req_id, ok, payload in results:
+                    requests[req_id].finish(ok, payload)
+                self._idle.put(slot)
+            self._reap()
+
+    def _reap(self): # Replaces workers that died or ran past their batch's deadlines
+        now = time.time()
+        with self._lock:
+            stuck = [(slot, entry) for slot, entry in enumerate(self._slots)
+                     if not entry[0].is_alive() or (entry[2] and now >= entry[3])]
+            for slot, _ in stuck: self._slots[slot] = self._spawn()
+        for slot, (proc, conn, requests, kill_at) in stuck:
+            proc.terminate()
+            proc.join()
+            conn.close()
+            if not requests: continue # Died while idle, its slot is already queued
+            for req in requests.values():
+                req.finish(False, 'timeout' if now >= kill_at else "Worker process died")
+            self._idle.put(slot)
+
+    def stats(self):
+        return {'workers': len(self._slots), 'queued': self.pending.qsize()}
+
+    def close(self):
+        self._closed = True
+        self._idle.put(None)
+        try:
+            self.pending.put_nowait(None)
+        except queue.Full:
+            pass
+        for t in self._threads: t.join(1.0) # The collector may be mid-way through replacing a worker
+        with self._lock:
+            slots = list(self._slots)
+        for proc, conn, _, _ in slots:
+            conn.close()
+            proc.terminate()
+        for proc, _, _, _ in slots: proc.join()
+
+
+def parse_request(op, body): # Checks and normalises a request body; ValueError on bad input
+    params = {}
+    if op == 'solve' and 'puzzles' in body:
+        texts = body['puzzles']
+        if (not isinstance(texts, list) or not 1 <= len(texts) <= MAX_PUZZLES
+                or not all(isinstance(text, str) for text in texts)):
+            raise ValueError(f"'puzzles' must be a list of 1 to {MAX_PUZZLES} strings")
+        params.update(puzzles=[grid_to_string(string_to_grid(text)) for text in texts], many=True)
+    elif op in ('solve', 'count', 'rate'):
+        text = body.get('puzzle')
+        if not isinstance(text, str): raise ValueError("'puzzle' must be a string")
+        grid = string_to_grid(text)
+        if op != 'solve' and len(grid) != 9: raise ValueError(f"/{op} takes 9x9 puzzles only")
+        if op == 'solve': params.update(puzzles=[grid_to_string(grid)], many=False)
+        else: params['puzzle'] = grid_to_string(grid)
+        if op == 'count':
+            limit = body.get('limit', 2)
+            if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= MAX_COUNT_LIMIT:
+                raise ValueError(f"'limit' must be an integer from 1 to {MAX_COUNT_LIMIT}")
+            params['limit'] = limit
+    elif op == 'generate':
+        size = body.get('size', 9)
+        if size not in [b * b for b in BOX_SIZES]: raise ValueError(f"Unsupported size {size!r}")
+        band = body.get('band', 'Medium')
+        if band not in DIFFICULTY_ORDER: raise ValueError(f"'band' must be one of {', '.join(DIFFICULTY_ORDER)}")
+        params.update(size=size, band=band)
+    else:
+        raise ServiceError(404, f"No endpoint /{op}")
+    timeout = body.get('timeout', DEFAULT_TIMEOUT)
+    # JSON allows true and NaN here; neither is a usable number of seconds
+    if (not isinstance(timeout, (int, float)) or isinstance(timeout, bool)
+            or not math.isfinite(timeout) or timeout <= 0):
+        raise ValueError("'timeout' must be a positive number")
+    return params, min(float(timeout), MAX_TIMEOUT)
+
+
+class SolveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # Keep-alive, clients reuse one connection for many requests
+    disable_nagle_algorithm = True # Headers and body go out as two writes; don't hold the second for an ACK
+    pool = None # Set by make_server
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health': self._reply(200, self.pool.stats())
+        else: self._reply(404, {'error': f"No endpoint {self.path}"})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY:
+            self.close_connection = True
+            return self._reply(413, {'error': "Request body too large"})
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(body, dict): raise ValueError("Body must be a JSON object")
+            op = self.path.strip('/')
+            params, timeout = parse_request(op, body)
+            self._reply(200, self.pool.submit(op, params, timeout))
+        except ServiceError as e:
+            self._reply(e.status, {'error': str(e)})
+        except ValueError as e: # Also covers malformed JSON
+            self._reply(400, {'error': str(e)})
+
+    def log_message(self, *args): # One line per request would swamp the console at full rate
+        pass
+
+
+def make_server(pool, host=HOST, port=PORT):
+    handler = type('BoundSolveHandler', (SolveHandler,), {'pool': pool})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+# --- End Local solve service ---
+
+
+def main(): # python solve_service.py [--port 8765] [--workers N]
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON sudoku solve service")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--queue-limit', type=int, default=QUEUE_LIMIT)
+    args = parser.parse_args()
+    pool = WorkerPool(args.workers, args.batch_size, queue_limit=args.queue_limit)
+    server = make_server(pool, port=args.port)
+    print(f"Serving on http://{HOST}:{args.port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.close()
+
+if __name__ == '__main__':
+    main()
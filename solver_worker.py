@@ -0,0 +1,64 @@
+import queue
+import threading
+
+# --- Background solver worker ---
+# Runs one solve job on a daemon thread so the pygame loop never blocks on
+# a solver. The job talks to the main loop only through a bounded event
+# queue: progress events are dropped when the queue is full, the final
+# ('done', result) or ('error', message) event waits for room. Cancel sets
+# a flag the job polls through worker.should_stop().
+
+EVENT_QUEUE_SIZE = 256
+
+class SolverWorker:
+    def __init__(self, job, *args):
+        self.events = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(job, args), daemon=True)
+        self._thread.start()
+
+    def _run(self, job, args):
+        try:
+            result = job(self, *args)
+        except Exception as e: # Reported to the UI instead of killing the thread silently
+            self.post('error', repr(e))
+        else:
+            self.post('done', result)
+
+    def post(self, kind, payload=None): # Blocks while the queue is full, gives up on cancel
+        while not self._cancelled.is_set():
+            try:
+                self.events.put((kind, payload), timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def post_progress(self, kind, payload=None): # Never blocks the solver
+        try:
+            self.events.put_nowait((kind, payload))
+        except queue.Full:
+            pass
+
+    def should_stop(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def join(self, timeout=None): # True once the job has returned
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def drain(self, limit=EVENT_QUEUE_SIZE): # Events waiting right now, without blocking
+        drained = []
+        while len(drained) < limit:
+            try:
+                drained.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return drained
+
+    def is_alive(self):
+        return self._thread.is_alive()
+# --- End Background solver worker ---
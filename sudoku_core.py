@@ -0,0 +1,461 @@
+import json
+import math
+import random
+from collections import deque
+from functools import lru_cache
+from itertools import permutations
+from operator import itemgetter
+
+# Headless board logic shared by the pygame front end (main.py) and the
+# command line tools. Nothing in here may import pygame.
+
+GRID_SIZE    = 9
+
+# --- Board sizes ---
+# A board is an N x N list of rows with N = box*box, box 2..5 (4x4 up to
+# 25x25). Nothing stores the size: every function reads it off the grid it
+# is given. Digits run 1..N, 0 is an empty cell.
+BOX_SIZES = (2, 3, 4, 5)
+DIGIT_CHARS = '0123456789ABCDEFGHIJKLMNOP' # Text form of 0..25
+
+def box_size(grid): # 3 for a 9x9 board
+    return math.isqrt(len(grid))
+
+def all_digits_mask(size): # Bits 1..size set, bit 0 stands for "empty"
+    return ((1 << (size + 1)) - 1) ^ 1
+
+# Holes punched by default per box size. On 25x25 boards solve_mrv stays
+# under 0.05s up to 225 holes (36%), but by 300 some boards take seconds.
+DEFAULT_HOLES = {2: 6, 3: 40, 4: 120, 5: 225}
+
+def empty_grid(box=3):
+    return [[0] * (box*box) for _ in range(box*box)]
+# --- End Board sizes ---
+
+# Generate Random Sudoku
+def fill_diagonal_boxes(grid):
+    box = box_size(grid)
+    def fill_box(r, c):
+        nums = list(range(1, box*box + 1))
+        random.shuffle(nums)
+        for i in range(box):
+            for j in range(box):
+                grid[r+i][c+j] = nums.pop()
+    for start in range(0, box*box, box):
+        fill_box(start, start)
+
+def is_valid(grid, r, c, n):
+    size = len(grid)
+    if any(grid[r][j] == n for j in range(size)): return False
+    if any(grid[i][c] == n for i in range(size)): return False
+    box = box_size(grid)
+    br, bc = (r//box)*box, (c//box)*box
+    for i in range(br, br+box):
+        for j in range(bc, bc+box):
+            if grid[i][j] == n: return False
+    return True
+
+def backtrack_fill(grid): # Used for initial puzzle generation
+    solver = IterativeDFS(grid)
+    solver.run()
+    if solver.status != SOLVED: return False
+    for i in range(len(grid)):
+        grid[i][:] = solver.grid[i]
+    return True
+
+# --- Solved grids from symmetry transforms ---
+# Relabelling digits, permuting bands/stacks, permuting rows/columns inside
+# a band/stack and transposing all map a valid grid to another valid grid.
+# Applying a random mix of them to a cached seed costs a few microseconds,
+# against milliseconds for a fresh backtracking fill.
+SEED_COUNT = 8 # Backtracked grids kept per box size as seeds, built on first use
+_seed_solutions = {} # box -> [(rows, cols)]
+
+def backtracked_solution(box=3):
+    while True: # Random diagonal boxes can rule out every completion on 4x4 boards, so retry
+        grid = empty_grid(box)
+        fill_diagonal_boxes(grid)
+        if box <= 3:
+            if backtrack_fill(grid): return grid
+        else:
+            solved = solve_mrv(grid) # First-empty order stalls on 16x16 and up
+            if solved: return solved
+
+def pattern_solution(box): # Closed-form valid grid, for boards too big to backtrack quickly
+    size = box * box
+    return [[(box*(r % box) + r//box + c) % size + 1 for c in range(size)] for r in range(size)]
+
+@lru_cache(maxsize=None)
+def _box_perms(box):
+    return list(permutations(range(box)))
+
+def _shuffled_lines(box=3): # Row (or column) order: bands shuffled, lines shuffled within each band
+    choice = random.choice
+    perms = _box_perms(box)
+    return [band*box + line for band in choice(perms) for line in choice(perms)]
+
+def _permute_rows(rows): # rows: N bytes objects; relabels digits and reorders rows/columns
+    size = len(rows)
+    box = math.isqrt(size)
+    digits = list(range(1, size + 1))
+    random.shuffle(digits)
+    relabel = bytes([0] + digits) + bytes(255 - size) # bytes.translate wants a 256-entry table
+    pick_cols = itemgetter(*_shuffled_lines(box))
+    return [list(bytes(pick_cols(rows[r])).translate(relabel)) for r in _shuffled_lines(box)]
+
+def transform_grid(grid):
+    if random.random() < 0.5: # Transpose
+        return _permute_rows([bytes(col) for col in zip(*grid)])
+    return _permute_rows([bytes(row) for row in grid])
+
+def generate_solved_grid(method='transform', box=3):
+    # 'transform' shuffles a cached seed, 'backtrack' searches a fresh grid for full randomness
+    if method == 'backtrack': return backtracked_solution(box)
+    seeds = _seed_solutions.setdefault(box, [])
+    if not seeds:
+        for _ in range(SEED_COUNT): # Each seed is kept as rows and as columns, so transposing is free
+            # A 25x25 fill from the diagonal boxes can take a minute, so that
+            # size starts from the pattern grid and relies on the transforms
+            seed = backtracked_solution(box) if box <= 4 else transform_grid(pattern_solution(box))
+            seeds.append(([bytes(row) for row in seed], [bytes(col) for col in zip(*seed)]))
+    return _permute_rows(random.choice(random.choice(seeds)))
+# --- End Solved grids ---
+
+def generate_puzzle(holes=40, method='transform', box=3):
+    grid = generate_solved_grid(method, box)
+    size = len(grid)
+    for cell in random.sample(range(size * size), holes):
+        grid[cell // size][cell % size] = 0
+    return grid
+
+def find_empty(grid):
+    size = len(grid)
+    for i in range(size):
+        for j in range(size):
+            if grid[i][j] == 0: return i, j
+    return None
+
+
+# --- Search state with an undo trail ---
+# One board plus what the searches derive from it: the digits used per
+# row/col/box (a cell's candidates are one OR away), the number of empty
+# cells, and a trail of the placements made since the givens, each with the
+# search-tree node the caller tagged it with. place() and undo() touch only
+# what one placement changes, and restore() rolls a whole branch back to a
+# snapshot() the same way, so no engine copies a board per node.
+class SearchState:
+    def __init__(self, grid):
+        self.grid = [row[:] for row in grid]
+        self.size, self.box = len(grid), box_size(grid)
+        self.all_digits = all_digits_mask(self.size)
+        self.rows, self.cols, self.boxes = [0]*self.size, [0]*self.size, [0]*self.size
+        self.empty = 0 # Empty cells left
+        self.clash = False # Some given repeats a digit in its row, column or box
+        self.trail = [] # (r, c, n) per placement, oldest first
+        self.nodes = [] # Tree node tagged on each placement, None if untagged
+        self.root = None # Tree node for depth 0
+        box = self.box
+        for r, row in enumerate(grid):
+            for c, n in enumerate(row):
+                if not n:
+                    self.empty += 1
+                    continue
+                bit = 1 << n
+                b = (r//box)*box + c//box
+                if (self.rows[r] | self.cols[c] | self.boxes[b]) & bit: self.clash = True
+                self.rows[r] |= bit; self.cols[c] |= bit; self.boxes[b] |= bit
+
+    def candidates(self, r, c): # Digits still free for (r, c), as a bitmask
+        box = self.box
+        return ~(self.rows[r] | self.cols[c] | self.boxes[(r//box)*box + c//box]) & self.all_digits
+
+    def place(self, r, c, n): # n must be one of the cell's candidates
+        bit = 1 << n
+        box = self.box
+        self.grid[r][c] = n
+        self.rows[r] ^= bit; self.cols[c] ^= bit; self.boxes[(r//box)*box + c//box] ^= bit
+        self.empty -= 1
+        self.trail.append((r, c, n))
+        self.nodes.append(None)
+
+    def undo(self): # Takes back the newest placement; returns (r, c, n, node)
+        r, c, n = self.trail.pop()
+        bit = 1 << n
+        box = self.box
+        self.grid[r][c] = 0
+        self.rows[r] ^= bit; self.cols[c] ^= bit; self.boxes[(r//box)*box + c//box] ^= bit
+        self.empty += 1
+        return r, c, n, self.nodes.pop()
+
+    def snapshot(self): # Token for restore(); valid while the placements before it stand
+        return len(self.trail)
+
+    def restore(self, snapshot):
+        while len(self.trail) > snapshot: self.undo()
+
+    def tag(self, node, depth=None): # Attaches node to the placement at depth (1 = first), default the newest
+        self.nodes[(depth or len(self.nodes)) - 1] = node
+
+    def node(self, depth=None): # Tree node at depth, the root for 0; default the newest
+        if depth is None: depth = len(self.nodes)
+        return self.nodes[depth - 1] if depth else self.root
+
+    def first_empty(self, start=0): # First empty cell index r*N + c at or after start, None if full
+        size = self.size
+        for idx in range(start, size * size):
+            if not self.grid[idx // size][idx % size]: return idx
+        return None
+# --- End Search state ---
+
+
+# --- Plain BFS (one board per queue entry) ---
+# Boards always fill the first empty cell, so every board at depth d has
+# filled the same d cells of the puzzle. A board is therefore named by the
+# digits it placed, and the first k of them name its ancestor at depth k.
+# The queue holds those names, not boards: one SearchState moves from each
+# board to the next by undoing back to the digits they share and placing
+# the rest. Queue order keeps neighbours close, so that is a digit or two.
+# Two names never give the same board, so nothing needs deduplicating.
+SAMPLE_SIZE = 12 # Frontier boards handed to on_sample per level
+
+def empty_cells(grid): # (r, c) in the order BFS and DFS fill them
+    return [(r, c) for r in range(len(grid)) for c in range(len(grid)) if grid[r][c] == 0]
+
+def solve_bfs(initial_grid_state, should_stop=None, on_level=None, on_sample=None):
+    # on_level(depth, frontier_size) runs when a level is complete;
+    # on_sample(depth, paths) gets up to SAMPLE_SIZE random frontier boards
+    # as their placed digits. The sample is a reservoir filled while the
+    # level is queued, O(1) per board, so nothing walks the queue for it.
+    state = SearchState(initial_grid_state)
+    if state.clash: return None
+    empties = empty_cells(initial_grid_state)
+    digits = range(1, state.size + 1)
+    queue = deque([()])
+    loaded = () # Digits of the board state holds
+    sample, queued = [()], 1 # Reservoir and board count of the level being queued
+
+    popped = 0
+    level = -1
+    while queue:
+        popped += 1
+        if should_stop is not None and popped % 1024 == 0 and should_stop(): return None
+        path = queue.popleft()
+        depth = len(path)
+        if depth > level: # First board of a new level: the rest of the level is still queued
+            level = depth
+            if on_level: on_level(depth, len(queue) + 1)
+            if on_sample:
+                on_sample(depth, sorted(sample)) # Sorted is queue order
+                sample, queued = [], 0
+        shared = min(depth, len(loaded))
+        while path[:shared] != loaded[:shared]: shared -= 1
+        state.restore(shared)
+        for i in range(shared, depth): state.place(*empties[i], path[i])
+        loaded = path
+        if depth == len(empties): return [row[:] for row in state.grid]
+        r, c = empties[depth]
+        free = state.candidates(r, c)
+        children = [path + (n,) for n in digits if free >> n & 1]
+        queue.extend(children)
+        if on_sample:
+            for child in children:
+                queued += 1
+                if len(sample) < SAMPLE_SIZE: sample.append(child)
+                else:
+                    slot = random.randrange(queued)
+                    if slot < SAMPLE_SIZE: sample[slot] = child
+    return None
+# --- End Plain BFS ---
+
+
+# --- 81-char text format ---
+# One puzzle per line, row by row, '0' or '.' for an empty cell. Larger
+# boards use the same layout (256 or 625 chars) with digits past 9 written
+# as letters, 10 = 'A' ... 25 = 'P'.
+_CHAR_VALUES = {ch: n for n, ch in enumerate(DIGIT_CHARS)}
+_CHAR_VALUES.update({ch.lower(): n for ch, n in _CHAR_VALUES.items()})
+_CHAR_VALUES['.'] = 0
+
+def grid_to_string(grid):
+    return ''.join(DIGIT_CHARS[n] for row in grid for n in row)
+
+def string_to_grid(text):
+    text = text.strip()
+    size = math.isqrt(len(text))
+    if size * size != len(text) or math.isqrt(size) not in BOX_SIZES or math.isqrt(size)**2 != size:
+        raise ValueError(f"Expected 16, 81, 256 or 625 characters, got {len(text)}")
+    try:
+        digits = [_CHAR_VALUES[ch] for ch in text]
+    except KeyError as e:
+        raise ValueError(f"Unexpected character {e.args[0]!r}") from None
+    if max(digits) > size:
+        raise ValueError(f"Digit {DIGIT_CHARS[max(digits)]} does not fit a {size}x{size} board")
+    return [digits[i*size:(i+1)*size] for i in range(size)]
+# --- End text format ---
+
+
+# --- Bitmask DFS with most-constrained-cell ordering ---
+# Same search as backtrack_fill, but row/col/box usage is kept in bitmasks and
+# the cell with the fewest candidates is always filled next.
+def _bit_count(mask):
+    return bin(mask).count('1')
+
+def solve_mrv(grid): # Returns a solved copy of grid or None
+    size, box = len(grid), box_size(grid)
+    all_digits = all_digits_mask(size)
+    rows, cols, boxes = [0]*size, [0]*size, [0]*size
+    empties = []
+    for r in range(size):
+        for c in range(size):
+            n = grid[r][c]
+            if n:
+                bit = 1 << n
+                b = (r//box)*box + c//box
+                if (rows[r] | cols[c] | boxes[b]) & bit: return None # Clash in the givens
+                rows[r] |= bit; cols[c] |= bit; boxes[b] |= bit
+            else:
+                empties.append((r, c, (r//box)*box + c//box))
+    result = [row[:] for row in grid]
+
+    def search():
+        if not empties: return True
+        best_idx, best_free, best_count = -1, 0, size + 1
+        for idx, (r, c, b) in enumerate(empties):
+            free = ~(rows[r] | cols[c] | boxes[b]) & all_digits
+            count = _bit_count(free)
+            if count < best_count:
+                best_idx, best_free, best_count = idx, free, count
+                if count <= 1: break
+        if best_count == 0: return False
+        r, c, b = empties[best_idx]
+        empties[best_idx] = empties[-1]
+        empties.pop()
+        while best_free:
+            bit = best_free & -best_free
+            best_free ^= bit
+            rows[r] |= bit; cols[c] |= bit; boxes[b] |= bit
+            if search():
+                result[r][c] = bit.bit_length() - 1
+                return True
+            rows[r] ^= bit; cols[c] ^= bit; boxes[b] ^= bit
+        empties.append((r, c, b))
+        empties[best_idx], empties[-1] = empties[-1], empties[best_idx]
+        return False
+
+    return result if search() else None
+# --- End Bitmask DFS ---
+
+
+# --- Iterative DFS with an explicit stack ---
+# Same search order as the old recursive solver (first empty cell, digits
+# 1..N), but the recursion lives in a list of [cell, next candidate] frames.
+# One step() does one visible action, so a caller can pause between steps,
+# cancel, or serialize the whole search and pick it up again later. Board,
+# masks and the tree nodes of the current path live in a SearchState.
+
+# Solver status values
+RUNNING   = 'running'
+SOLVED    = 'solved'
+EXHAUSTED = 'exhausted' # Every branch tried, no solution
+CANCELLED = 'cancelled'
+
+class IterativeDFS:
+    def __init__(self, grid):
+        self.puzzle = [row[:] for row in grid]
+        self.state = SearchState(grid)
+        self.grid = self.state.grid # Shared, so callers see every placement
+        self.size, self.box = len(grid), box_size(grid)
+        self.stack = [] # Frames: [cell index 0..N*N-1, next digit to try 1..N+1]
+        self.status = RUNNING
+        self.paused = False
+        self.steps = 0
+        self.undone_node = None # Tree node of the placement the last backtrack took back
+        first = self.state.first_empty()
+        if self.state.clash: self.status = EXHAUSTED # Clashing givens, nothing to search
+        elif first is None: self.status = SOLVED
+        else: self.stack.append([first, 1])
+
+    def step(self):
+        # Returns ('try', r, c, n, depth), ('backtrack', r, c, n, depth) or
+        # None once the search is no longer running. A caller drawing the
+        # tree tags each try with state.tag(node) and finds the backtracked
+        # node in undone_node.
+        state = self.state
+        while self.status == RUNNING:
+            if not self.stack:
+                self.status = EXHAUSTED
+                return None
+            depth = len(self.stack)
+            frame = self.stack[-1]
+            r, c = divmod(frame[0], self.size)
+            placed = self.grid[r][c]
+            if placed: # Came back up from a failed child: undo this frame's digit
+                self.undone_node = state.undo()[3]
+                self.steps += 1
+                return ('backtrack', r, c, placed, depth)
+            free = state.candidates(r, c) >> frame[1] << frame[1] # Digits below frame[1] are done
+            if free:
+                n = (free & -free).bit_length() - 1
+                frame[1] = n + 1
+                state.place(r, c, n)
+                if not state.empty: self.status = SOLVED
+                else: self.stack.append([state.first_empty(frame[0] + 1), 1])
+                self.steps += 1
+                return ('try', r, c, n, depth)
+            self.stack.pop() # No digit left for this cell
+        return None
+
+    def run(self, max_steps=None): # Steps until done, paused, cancelled or out of budget
+        taken = 0
+        while self.status == RUNNING and not self.paused:
+            if max_steps is not None and taken >= max_steps: break
+            self.step()
+            taken += 1
+        return self.status
+
+    def pause(self): self.paused = True
+    def resume(self): self.paused = False
+    def cancel(self): self.status = CANCELLED
+
+    def path(self): # (r, c, n) placed by the frames currently on the stack
+        return list(self.state.trail)
+
+    # --- Checkpointing ---
+    def _pack_base(self): # Smallest power of two above the largest next digit, 16 for 9x9
+        return 1 << (self.size + 1).bit_length()
+
+    def to_dict(self):
+        base = self._pack_base()
+        return {'puzzle': grid_to_string(self.puzzle), 'grid': grid_to_string(self.grid),
+                'stack': [cell * base + next_n for cell, next_n in self.stack], # cell and next digit packed in one int
+                'status': self.status, 'steps': self.steps}
+
+    @classmethod
+    def from_dict(cls, data):
+        solver = cls(string_to_grid(data['puzzle']))
+        if solver.state.clash: raise ValueError("Checkpoint puzzle has clashing givens")
+        grid = string_to_grid(data['grid'])
+        if len(grid) != solver.size: raise ValueError("Checkpoint board and puzzle differ in size")
+        base = solver._pack_base()
+        solver.stack = [[packed // base, packed % base] for packed in data['stack']]
+        for cell, _ in solver.stack: # Replays the saved path onto the trail
+            if not 0 <= cell < solver.size * solver.size: raise ValueError(f"Checkpoint stack names cell {cell}")
+            r, c = divmod(cell, solver.size)
+            n = grid[r][c]
+            if not n: continue
+            if solver.grid[r][c] or not solver.state.candidates(r, c) >> n & 1:
+                raise ValueError(f"Checkpoint places {n} at row {r + 1}, column {c + 1} against the board")
+            solver.state.place(r, c, n)
+        solver.status = data['status']
+        solver.steps = data['steps']
+        return solver
+
+    def save_checkpoint(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load_checkpoint(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+# --- End Iterative DFS ---
@@ -0,0 +1,112 @@
+import gzip
+import json
+import sys
+from functools import lru_cache
+
+from sudoku_core import IterativeDFS, SOLVED, string_to_grid
+
+# --- Streaming search-tree export ---
+# Writes search tree nodes and their status changes to a file as the search
+# produces them, so a tree of any size can be analysed outside the app
+# without ever being held in memory. Lines are collected in a small buffer
+# and written in blocks; a '.gz' suffix compresses on the fly.
+#
+# JSON Lines: one object per event,
+#   {"event": "node", "id": 2, "parent": 1, "label": "(0,1)=3", "depth": 1, "status": "trying"}
+#   {"event": "status", "id": 2, "status": "backtracked"}
+# DOT: a digraph with one statement per node and edge. A status change
+# re-states the node with its new colour, which Graphviz applies on top.
+
+BUFFER_LINES = 8192     # Lines held before a block write
+FILE_BUFFER = 1 << 20   # Bytes of OS-level write buffer for plain files
+GZIP_LEVEL = 1          # Fastest compression; trees compress well anyway
+STATUS_COLORS = {'root': 'gray', 'trying': 'lightblue', 'backtracked': 'salmon', 'solution': 'palegreen'}
+
+
+@lru_cache(maxsize=4096)
+def _quote(label): # Labels repeat a lot ("(r,c)=n"), so quoting is cached
+    return json.dumps(label)
+
+
+class TreeExporter:
+    def __init__(self, path, fmt=None, compress=None):
+        # fmt 'jsonl' or 'dot', and compress, default from the file name
+        base = path[:-3] if path.endswith('.gz') else path
+        self.fmt = fmt or ('dot' if base.endswith('.dot') else 'jsonl')
+        compress = path.endswith('.gz') if compress is None else compress
+        if compress: self._file = gzip.open(path, 'wt', compresslevel=GZIP_LEVEL)
+        else: self._file = open(path, 'w', buffering=FILE_BUFFER)
+        self._dot = self.fmt == 'dot'
+        self._lines = []
+        self.nodes = 0
+        if self._dot:
+            self._lines.append('digraph search {\n  node [style=filled];\n')
+
+    # add_node and set_status are called once per search step, so they
+    # append to the buffer inline rather than through a helper
+    def add_node(self, node_id, parent_id, label, depth, status='trying'):
+        self.nodes += 1
+        lines = self._lines
+        if self._dot:
+            edge = '' if parent_id is None else f'  n{parent_id} -> n{node_id};\n'
+            lines.append(f'  n{node_id} [label={_quote(label)}, fillcolor={STATUS_COLORS[status]}];\n{edge}')
+        else:
+            parent = 'null' if parent_id is None else parent_id
+            lines.append(f'{{"event": "node", "id": {node_id}, "parent": {parent}, "label": {_quote(label)}, '
+                         f'"depth": {depth}, "status": "{status}"}}\n')
+        if len(lines) >= BUFFER_LINES: self._flush()
+
+    def set_status(self, node_id, status):
+        lines = self._lines
+        if self._dot: lines.append(f'  n{node_id} [fillcolor={STATUS_COLORS[status]}];\n')
+        else: lines.append(f'{{"event": "status", "id": {node_id}, "status": "{status}"}}\n')
+        if len(lines) >= BUFFER_LINES: self._flush()
+
+    def _flush(self):
+        self._file.write(''.join(self._lines))
+        self._lines.clear()
+
+    def close(self):
+        if self._file.closed: return
+        if self._dot: self._lines.append('}\n')
+        self._flush()
+        self._file.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+
+def export_dfs_tree(grid, path, max_steps=None, fmt=None):
+    # Runs IterativeDFS on grid and streams its tree to path. Only the ids
+    # on the current search path are kept, on the solver's trail. Returns
+    # (solver status, nodes).
+    solver = IterativeDFS(grid)
+    state = solver.state
+    state.root = 1
+    with TreeExporter(path, fmt) as out:
+        out.add_node(1, None, 'DFS Root', 0, 'root')
+        next_id = 2
+        step = solver.step
+        while max_steps is None or solver.steps < max_steps:
+            event = step()
+            if event is None: break
+            kind, r, c, n, depth = event
+            if kind == 'try':
+                out.add_node(next_id, state.node(depth - 1), f'({r},{c})={n}', depth)
+                state.tag(next_id)
+                next_id += 1
+            else:
+                out.set_status(solver.undone_node, 'backtracked')
+        if solver.status == SOLVED:
+            for node_id in state.nodes: out.set_status(node_id, 'solution')
+        return solver.status, out.nodes
+# --- End Streaming search-tree export ---
+
+
+def main(): # python tree_export.py <81-char puzzle> <out.jsonl|out.dot[.gz]> [max steps]
+    max_steps = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    status, nodes = export_dfs_tree(string_to_grid(sys.argv[1]), sys.argv[2], max_steps)
+    print(f"{status}: {nodes} nodes written to {sys.argv[2]}")
+
+if __name__ == '__main__':
+    main()
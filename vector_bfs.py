@@ -0,0 +1,117 @@
+from functools import lru_cache
+import math
+import random
+
+import numpy as np
+
+from sudoku_core import SAMPLE_SIZE
+
+# --- Level-synchronous BFS over batched boards (NumPy) ---
+# The whole frontier of one BFS level lives in a single (N, cells) uint8
+# array, 81 cells for a 9x9 board and up to 625 for 25x25. Candidate digits
+# for every board are computed at once from row/col/box OR-reductions, and
+# all children of the level are produced by one fancy-index copy instead of
+# a deepcopy per child.
+
+
+@lru_cache(maxsize=None)
+def _tables(cells): # Index tables for one board size, built on first use
+    size = math.isqrt(cells)
+    box = math.isqrt(size)
+    mask_type = np.uint16 if size < 16 else np.uint32 # Bits 1..size must fit
+    cell_row = np.arange(cells) // size
+    cell_col = np.arange(cells) % size
+    return {
+        'size': size, 'box': box,
+        'all_digits': mask_type(((1 << (size + 1)) - 1) ^ 1), # Bit 0 stands for "empty"
+        'digit_bit': np.array([0] + [1 << d for d in range(1, size + 1)], dtype=mask_type),
+        'digit_shifts': np.arange(1, size + 1, dtype=mask_type),
+        'cell_row': cell_row, 'cell_col': cell_col,
+        'cell_box': (cell_row // box) * box + cell_col // box,
+    }
+
+
+def grid_to_array(grid):
+    return np.array(grid, dtype=np.uint8).reshape(-1)
+
+def array_to_grid(board):
+    size = math.isqrt(board.size)
+    return board.reshape(size, size).tolist()
+
+
+def unit_masks(boards): # boards: (N, cells) -> three (N, size) masks of used digits
+    t = _tables(boards.shape[1])
+    size, box = t['size'], t['box']
+    bits = t['digit_bit'][boards].reshape(-1, size, size)
+    rows = np.bitwise_or.reduce(bits, axis=2)
+    cols = np.bitwise_or.reduce(bits, axis=1)
+    boxes = bits.reshape(-1, box, box, box, box).transpose(0, 1, 3, 2, 4).reshape(-1, size, size)
+    boxes = np.bitwise_or.reduce(boxes, axis=2)
+    return rows, cols, boxes
+
+def candidate_masks(boards): # (N, cells) candidate masks, 0 for filled cells
+    t = _tables(boards.shape[1])
+    rows, cols, boxes = unit_masks(boards)
+    used = rows[:, t['cell_row']] | cols[:, t['cell_col']] | boxes[:, t['cell_box']]
+    cand = ~used & t['all_digits']
+    cand[boards != 0] = 0
+    return cand
+
+
+EXPAND_CHUNK = 32768 # Parents expanded per pass; should_stop() is checked between passes
+
+def _expand_chunk(frontier):
+    t = _tables(frontier.shape[1])
+    n = np.arange(len(frontier))
+    cells = (frontier == 0).argmax(axis=1) # First empty cell, same order as find_empty
+    rows, cols, boxes = unit_masks(frontier)
+    used = rows[n, t['cell_row'][cells]] | cols[n, t['cell_col'][cells]] | boxes[n, t['cell_box'][cells]]
+    allowed = ((~used & t['all_digits'])[:, None] >> t['digit_shifts']) & 1
+    # nonzero walks parents in order and digits ascending, matching the plain BFS queue
+    parent_idx, digit_idx = np.nonzero(allowed)
+    children = frontier[parent_idx]
+    children[np.arange(len(parent_idx)), cells[parent_idx]] = digit_idx + 1
+    return children
+
+def expand_level(frontier, should_stop=None):
+    # All children of a level, or None if should_stop() fires part way;
+    # every board must have an empty cell. Boards of one level have filled
+    # the same cells, so siblings differ in their new digit and cousins in
+    # an ancestor's: a level never holds the same board twice.
+    chunks = []
+    for lo in range(0, len(frontier), EXPAND_CHUNK):
+        if should_stop is not None and should_stop(): return None
+        chunks.append(_expand_chunk(frontier[lo:lo + EXPAND_CHUNK]))
+    return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+
+def bfs_levels(start_boards, cells=81, should_stop=None): # Yields (depth, frontier) until a level holds a full board
+    frontier = np.asarray(start_boards, dtype=np.uint8).reshape(-1, cells)
+    depth = 0
+    while len(frontier):
+        yield depth, frontier
+        if (frontier != 0).all(axis=1).any(): return
+        frontier = expand_level(frontier, should_stop)
+        if frontier is None: return # Stopped mid-level
+        depth += 1
+
+def sample_paths(frontier, empties, depth, count=SAMPLE_SIZE):
+    # Up to count random boards of a level, named by the digits they placed
+    # in the puzzle's empty cells (see solve_bfs). Costs O(count), not O(frontier).
+    picks = sorted(random.sample(range(len(frontier)), min(count, len(frontier))))
+    return [tuple(row) for row in frontier[np.ix_(picks, empties[:depth])].tolist()]
+
+def solve_bfs_vectorized(initial_grid_state, on_level=None, should_stop=None, on_sample=None):
+    # on_level(depth, frontier_size) is called once per level; should_stop() can abandon the search;
+    # on_sample(depth, paths) gets a bounded random sample of each level
+    start = grid_to_array(initial_grid_state)
+    empties = np.flatnonzero(start == 0)
+    for depth, frontier in bfs_levels(start, start.size, should_stop):
+        if should_stop is not None and should_stop(): return None
+        if on_level is not None: on_level(depth, len(frontier))
+        if on_sample is not None: on_sample(depth, sample_paths(frontier, empties, depth))
+        full = (frontier != 0).all(axis=1)
+        if full.any():
+            return array_to_grid(frontier[full.argmax()])
+    return None
+# --- End Level-synchronous BFS ---